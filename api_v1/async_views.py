@@ -0,0 +1,93 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from rest_framework.renderers import JSONRenderer
+
+from api_v1.cache import ALL_VERSION, LIST_VERSION, aget_versions, book_version, get_cache, parse_etags, \
+    response_key
+from api_v1.replicas import is_pinned
+from api_v1.serializers import UserBookRelationSerializer
+from api_v1.views import BookViewSet
+from store.models import UserBookRelation
+
+book_list_view = BookViewSet.as_view({'get': 'list'})
+book_detail_view = BookViewSet.as_view({'get': 'retrieve'})
+RELATIONS_PAGE_SIZE = 100
+
+
+def render_view(view, request, **kwargs):
+    response = view(request, **kwargs)
+    response.render()
+    return response
+
+
+async def cached_book_response(request, version_names, view, **kwargs):
+    # Cache hits and 304s are answered on the event loop, only misses go to the sync view in a thread.
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if settings.BOOKS_READ_REPLICAS and await sync_to_async(is_pinned)(request.user):
+        # Served from the primary without the response cache, see ReplicaReadMixin.cache_reads.
+        return await sync_to_async(render_view)(view, request, **kwargs)
+    key, etag = response_key(request, await aget_versions(*version_names))
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponse(status=304)
+    else:
+        data = await get_cache().aget(key)
+        if data is None:
+            return await sync_to_async(render_view)(view, request, **kwargs)
+        response = HttpResponse(JSONRenderer().render(data), content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+async def book_list(request):
+    return await cached_book_response(request, [ALL_VERSION, LIST_VERSION], book_list_view)
+
+
+async def book_detail(request, pk):
+    return await cached_book_response(request, [ALL_VERSION, book_version(pk)], book_detail_view, pk=pk)
+
+
+def relations_page(user, after, size):
+    relations = UserBookRelation.objects.filter(user=user, book_id__gt=after).order_by('book_id')[:size + 1]
+    relations = list(relations)
+    return UserBookRelationSerializer(relations[:size], many=True).data, len(relations) > size
+
+
+def relation_detail(user, book):
+    relation = UserBookRelation.objects.filter(user=user, book_id=book).first()
+    return relation and UserBookRelationSerializer(relation).data
+
+
+async def authenticated(request):
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+async def relation_list(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not await authenticated(request):
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    try:
+        after = int(request.GET.get('after', 0))
+        size = min(int(request.GET.get('page_size', RELATIONS_PAGE_SIZE)), RELATIONS_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'detail': 'after and page_size must be integers.'}, status=400)
+    results, has_more = await sync_to_async(relations_page)(request.user, after, max(size, 1))
+    next_link = None
+    if has_more:
+        query = request.GET.copy()
+        query['after'] = results[-1]['book']
+        next_link = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return JsonResponse({'next': next_link, 'results': results})
+
+
+async def relation_retrieve(request, book):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not await authenticated(request):
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    data = await sync_to_async(relation_detail)(request.user, book)
+    if data is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    return JsonResponse(data)
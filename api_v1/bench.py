@@ -0,0 +1,158 @@
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import resolve
+from django.utils.http import urlencode
+
+from api_v1.logic import link_authors, rebuild_counters
+from api_v1.search import get_search_backend
+from api_v1.utils import chunked
+from store.models import Book, User, UserBookRelation
+
+
+def seed_catalog(books, users, relations, batch_size=5000, seed=0):
+    rnd = random.Random(seed)
+    users_before = User.objects.count()
+    User.objects.bulk_create(
+        (User(username=f'bench_user_{users_before + i}') for i in range(users)), batch_size=batch_size
+    )
+    user_ids = list(User.objects.order_by('-pk').values_list('pk', flat=True)[:users])
+    owners = user_ids + [None]
+    Book.objects.bulk_create(
+        (
+            Book(
+                name=f'Bench Book {i}',
+                price=rnd.randint(100, 99999) / 100,
+                author_name=f'Bench Author {i % 1000}',
+                owner_id=rnd.choice(owners),
+                discount=rnd.randint(0, 99) / 100,
+            )
+            for i in range(books)
+        ),
+        batch_size=batch_size,
+    )
+    book_ids = list(Book.objects.order_by('-pk').values_list('pk', flat=True)[:books])
+    link_authors(Book.objects.filter(pk__gte=min(book_ids, default=0)))
+    relations = min(relations, len(user_ids) * len(book_ids))
+    per_user = -(-relations // max(len(user_ids), 1))
+
+    def generate():
+        remaining = relations
+        for user_id in user_ids:
+            for book_id in rnd.sample(book_ids, min(per_user, remaining, len(book_ids))):
+                yield UserBookRelation(
+                    user_id=user_id,
+                    book_id=book_id,
+                    is_liked=rnd.random() < 0.3,
+                    is_bookmarked=rnd.random() < 0.1,
+                    rate=rnd.choice((None, 1, 2, 3, 4, 5)),
+                )
+                remaining -= 1
+            if not remaining:
+                return
+
+    for chunk in chunked(generate(), batch_size):
+        UserBookRelation.objects.bulk_create(chunk)
+    seeded = Book.objects.filter(pk__gte=min(book_ids, default=0))
+    rebuild_counters(seeded)
+    # bulk_create skips the search index, search requests of the mix would match nothing.
+    get_search_backend().index(seeded)
+    return book_ids
+
+
+def time_call(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def time_queryset(queryset, repeat=5, limit=None):
+    return time_call(lambda: list(queryset[:limit] if limit else queryset.all()), repeat)
+
+
+def percentile(timings, value):
+    return timings[min(len(timings) - 1, int(len(timings) * value))]
+
+
+REQUEST_MIX = {'list': 40, 'search': 20, 'order': 15, 'filter': 15, 'rate': 10}
+ORDERINGS = ('price', '-price', 'author_name', '-author_name')
+
+
+def generate_requests(mix, count, book_ids, seed=0):
+    """Yields (label, method, path, data) tuples drawn from the weights in mix, see REQUEST_MIX."""
+    rnd = random.Random(seed)
+    prices = list(Book.objects.filter(pk__in=book_ids[:1000]).values_list('price', flat=True))
+
+    def books(**params):
+        return 'GET', f'/api/v1/book/?{urlencode(params)}', None
+
+    builders = {
+        'list': lambda: books(page=rnd.randint(1, 10)),
+        'search': lambda: books(search=f'Bench Author {rnd.randrange(1000)}'),
+        'order': lambda: books(ordering=rnd.choice(ORDERINGS), page=rnd.randint(1, 10)),
+        'filter': lambda: books(price=rnd.choice(prices)),
+        'rate': lambda: ('PATCH', f'/api/v1/book_relation/{rnd.choice(book_ids)}/', {'rate': rnd.randint(1, 5)}),
+    }
+    labels, weights = zip(*mix.items())
+    for label in rnd.choices(labels, weights, k=count):
+        yield (label,) + builders[label]()
+
+
+def read_requests(path):
+    """
+    Reads recorded requests, one JSON object per line with method, path and optionally
+    data (the JSON body) and name (the label to report under, the view name by default).
+    """
+    with open(path) as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            method = record.get('method', 'GET').upper()
+            label = record.get('name') or f'{method} {resolve(urlsplit(record["path"]).path).view_name}'
+            yield label, method, record['path'], record.get('data')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def replay(client, requests, using=DEFAULT_DB_ALIAS):
+    """Runs requests one after another and returns (label, status, seconds, queries) per request."""
+    results = []
+    for label, method, path, data in requests:
+        counter = QueryCounter()
+        body = '' if data is None else json.dumps(data)
+        started = time.perf_counter()
+        with connections[using].execute_wrapper(counter):
+            response = client.generic(method, path, body, content_type='application/json')
+        results.append((label, response.status_code, time.perf_counter() - started, counter.count))
+    return results
+
+
+def summarize(results):
+    endpoints = {}
+    for label in sorted({result[0] for result in results}):
+        rows = [result for result in results if result[0] == label]
+        timings = sorted(timing for _, _, timing, _ in rows)
+        endpoints[label] = {
+            'requests': len(rows),
+            'errors': sum(code >= 400 for _, code, _, _ in rows),
+            'rps': round(len(rows) / sum(timings), 1) if sum(timings) else None,
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'queries': round(sum(queries for *_, queries in rows) / len(rows), 2),
+        }
+    return endpoints
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from api_v1.cache import invalidate_book
+from api_v1.logic import link_authors, rebuild_counters
+from api_v1.search import get_search_backend
+from api_v1.serializers import BookSerializer, UserBookRelationBulkSerializer
+from api_v1.utils import chunked
+from store.models import Book, UserBookRelation
+
+
+def refresh_books(pks):
+    if not pks:
+        return
+    get_search_backend().index(Book.objects.filter(pk__in=pks))
+    invalidate_book(*pks)
+
+
+def error(index, errors):
+    return {'index': index, 'status': 'error', 'errors': errors}
+
+
+def bulk_save_books(items, user):
+    serializer = BookSerializer(many=True)
+    fields = [name for name, field in serializer.child.fields.items() if not field.read_only]
+    results = [None] * len(items)
+    creates, updates = [], {}
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = error(index, {'non_field_errors': ['Expected a book object.']})
+            continue
+        pk = item.get('id')
+        if pk is not None and (not isinstance(pk, int) or isinstance(pk, bool)):
+            results[index] = error(index, {'id': ['A valid integer is required.']})
+            continue
+        try:
+            data = serializer.child.run_validation(item)
+        except ValidationError as exc:
+            results[index] = error(index, exc.detail)
+            continue
+        if pk is None:
+            creates.append((index, data))
+        else:
+            updates.setdefault(pk, []).append((index, data))
+
+    books = Book.objects.only('pk', 'owner_id', *fields).in_bulk(list(updates))
+    changed = []
+    for pk, entries in updates.items():
+        book = books.get(pk)
+        for index, data in entries:
+            if book is None:
+                results[index] = error(index, {'id': ['Not found.']})
+            elif book.owner_id != user.pk and not user.is_staff:
+                results[index] = error(index, {'id': ['You do not have permission to perform this action.']})
+            else:
+                for field, value in data.items():
+                    setattr(book, field, value)
+                results[index] = {'index': index, 'status': 'updated', 'id': pk}
+        if book is not None and any(results[index]['status'] == 'updated' for index, _ in entries):
+            changed.append(book)
+
+    chunk_size = settings.BOOKS_BULK_CHUNK_SIZE
+    for chunk in chunked(creates, chunk_size):
+        with transaction.atomic():
+            created = Book.objects.bulk_create([Book(owner=user, **data) for _, data in chunk])
+        for (index, _), book in zip(chunk, created):
+            results[index] = {'index': index, 'status': 'created', 'id': book.pk}
+    for chunk in chunked(changed, chunk_size):
+        with transaction.atomic():
+            Book.objects.bulk_update(chunk, fields)
+
+    saved = [result['id'] for result in results if result['status'] != 'error']
+    if saved:
+        link_authors(Book.objects.filter(pk__in=saved))
+    refresh_books(saved)
+    return results
+
+
+def bulk_upsert_relations(items, user):
+    serializer = UserBookRelationBulkSerializer(partial=True)
+    results = [None] * len(items)
+    changes = {}
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = error(index, {'non_field_errors': ['Expected a relation object.']})
+            continue
+        try:
+            data = serializer.run_validation(item)
+        except ValidationError as exc:
+            results[index] = error(index, exc.detail)
+            continue
+        if 'book' not in data:
+            results[index] = error(index, {'book': ['This field is required.']})
+            continue
+        changes.setdefault(data.pop('book'), []).append((index, data))
+
+    existing_books = set(Book.objects.filter(pk__in=list(changes)).values_list('pk', flat=True))
+    for book_id in set(changes) - existing_books:
+        for index, _ in changes.pop(book_id):
+            results[index] = error(index, {'book': [f'Invalid pk "{book_id}" - object does not exist.']})
+
+    chunk_size = settings.BOOKS_BULK_CHUNK_SIZE
+    with transaction.atomic():
+        # Book rows are locked first, so single relation updates wait for the counters rebuilt below
+        # instead of applying their deltas to values the rebuild is about to overwrite. FOR NO KEY UPDATE, as a
+        # FOR UPDATE lock would also block the FOR KEY SHARE lock of the foreign key check of relation inserts.
+        list(Book.objects.select_for_update(no_key=True).filter(pk__in=list(changes)).order_by('pk').values_list('pk'))
+        relations = UserBookRelation.objects.select_for_update().filter(user=user, book_id__in=list(changes))
+        existing = set(relations.values_list('book_id', flat=True))
+        UserBookRelation.objects.bulk_create(
+            [UserBookRelation(user=user, book_id=book_id) for book_id in changes if book_id not in existing],
+            batch_size=chunk_size, ignore_conflicts=True,
+        )
+        relations = {relation.book_id: relation for relation in relations.order_by('pk')}
+        fields = set()
+        for book_id, entries in changes.items():
+            relation = relations[book_id]
+            for index, data in entries:
+                for field, value in data.items():
+                    setattr(relation, field, value)
+                fields.update(data)
+                status = 'updated' if book_id in existing else 'created'
+                results[index] = {'index': index, 'status': status, 'book': book_id}
+
+        if fields:
+            UserBookRelation.objects.bulk_update(list(relations.values()), sorted(fields), batch_size=chunk_size)
+        rebuild_counters(Book.objects.filter(pk__in=list(changes)))
+
+    if changes:
+        invalidate_book(*changes)
+    return results
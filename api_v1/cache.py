@@ -0,0 +1,107 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+ALL_VERSION = 'books:version:all'
+LIST_VERSION = 'books:version:list'
+
+
+def get_cache():
+    return caches[settings.BOOKS_CACHE]
+
+
+def book_version(pk):
+    return f'books:version:book:{pk}'
+
+
+def get_versions(*names):
+    # Versions are timestamps rather than counters, so a version evicted from the
+    # cache comes back as a value no stale response was ever stored under.
+    cache = get_cache()
+    versions = cache.get_many(names)
+    missing = {name: time.time_ns() for name in names if name not in versions}
+    if missing:
+        for name, version in missing.items():
+            cache.add(name, version, timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions[name] for name in names]
+
+
+async def aget_versions(*names):
+    cache = get_cache()
+    versions = await cache.aget_many(names)
+    missing = {name: time.time_ns() for name in names if name not in versions}
+    if missing:
+        for name, version in missing.items():
+            await cache.aadd(name, version, timeout=None)
+        versions.update(await cache.aget_many(missing))
+    return [versions[name] for name in names]
+
+
+def bump_versions(*names):
+    get_cache().set_many({name: time.time_ns() for name in names}, timeout=None)
+
+
+def invalidate_book(*pks):
+    bump_versions(LIST_VERSION, *[book_version(pk) for pk in pks])
+
+
+def invalidate_books():
+    bump_versions(ALL_VERSION)
+
+
+def normalize_query(query_params, ignored=()):
+    return urlencode(sorted((key, value) for key, values in query_params.lists() for value in values
+                            if value != '' and key not in ignored))
+
+
+def parse_etags(header):
+    return {etag.strip().removeprefix('W/') for etag in header.split(',')}
+
+
+def response_key(request, versions, ignored=()):
+    signature = f'{request.get_host()}|{request.path}|{normalize_query(request.GET, ignored)}|{versions}'
+    key = f'books:response:{md5(signature.encode()).hexdigest()}'
+    return key, f'"{key.rsplit(":", 1)[-1]}"'
+
+
+class CachedResponseMixin:
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, [ALL_VERSION, LIST_VERSION], super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.cached_response(request, [ALL_VERSION, book_version(pk)], super().retrieve, *args, **kwargs)
+
+    def cache_reads(self, request):
+        return True
+
+    def cache_writes(self, request):
+        return True
+
+    def cached_response(self, request, version_names, handler, *args, ignored=(), **kwargs):
+        # Query parameters in ignored do not change the response and share its cache entry.
+        if not self.cache_reads(request):
+            return handler(request, *args, **kwargs)
+        key, etag = response_key(request, get_versions(*version_names), ignored)
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if self.cache_writes(request):
+                cache.set(key, response.data)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
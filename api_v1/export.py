@@ -0,0 +1,41 @@
+import csv
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = ('id', 'name', 'price', 'author_name', 'likes_count', 'rating', 'discounted_price', 'owner_name')
+CENTS = Decimal('0.01')
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=None):
+    chunk_size = chunk_size or settings.BOOKS_EXPORT_CHUNK_SIZE
+    for row in queryset.prefetch_related(None).values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        yield [value.quantize(CENTS) if isinstance(value, Decimal) else value for value in row]
+
+
+def to_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def to_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_books(queryset, export_format, chunk_size=None):
+    rows = export_rows(queryset, chunk_size)
+    return to_csv(rows) if export_format == 'csv' else to_ndjson(rows)
@@ -0,0 +1,63 @@
+from django.db.models import Count, F, Q
+from django_filters import rest_framework as filters
+
+from store.models import Book
+
+PRICE_BUCKETS = (0, 10, 20, 50, 100, 200, 500, 1000)
+RATING_BUCKETS = (1, 2, 3, 4, 5)
+AUTHOR_FACETS = 20
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
+
+class BookFilter(filters.FilterSet):
+    price = filters.NumberFilter()
+    price_min = filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = filters.NumberFilter(field_name='price', lookup_expr='lte')
+    discounted_price_min = filters.NumberFilter(method='filter_discounted_price')
+    discounted_price_max = filters.NumberFilter(method='filter_discounted_price')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    author = CharInFilter(field_name='author_name')
+    author_id = filters.NumberFilter()
+
+    class Meta:
+        model = Book
+        fields = ['price']
+
+    def filter_discounted_price(self, queryset, name, value):
+        # price - discount compared without an annotation, so the filter works on any Book queryset.
+        lookup = 'price__gte' if name.endswith('_min') else 'price__lte'
+        return queryset.filter(**{lookup: F('discount') + value})
+
+
+def price_bucket(index):
+    upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+    condition = Q(price__gte=PRICE_BUCKETS[index])
+    return upper, condition if upper is None else condition & Q(price__lt=upper)
+
+
+def rating_bucket(rating):
+    condition = Q(rating__gte=rating)
+    return condition if rating == RATING_BUCKETS[-1] else condition & Q(rating__lt=rating + 1)
+
+
+def book_facets(queryset):
+    """
+    Price buckets, rating distribution and author counts of the filtered books. The buckets are conditional
+    counts of one aggregate, the authors a GROUP BY author_name limited to the AUTHOR_FACETS largest in SQL.
+    """
+    queryset = queryset.order_by()
+    counts = {f'price_{index}': Count('pk', filter=price_bucket(index)[1]) for index in range(len(PRICE_BUCKETS))}
+    counts.update({f'rating_{rating}': Count('pk', filter=rating_bucket(rating)) for rating in RATING_BUCKETS})
+    totals = queryset.aggregate(total=Count('pk'), unrated=Count('pk', filter=Q(rating__isnull=True)), **counts)
+    authors = queryset.values('author_name').annotate(count=Count('pk')).order_by('-count', 'author_name')
+    return {
+        'count': totals['total'],
+        'price': [{'min': lower, 'max': price_bucket(index)[0], 'count': totals[f'price_{index}']}
+                  for index, lower in enumerate(PRICE_BUCKETS)],
+        'rating': [{'rating': rating, 'count': totals[f'rating_{rating}']} for rating in RATING_BUCKETS] +
+                  [{'rating': None, 'count': totals['unrated']}],
+        'authors': list(authors[:AUTHOR_FACETS]),
+    }
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import time
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connections
+
+from api_v1.cache import invalidate_books
+from api_v1.logic import link_authors, rebuild_counters
+from api_v1.search import get_search_backend
+from store.models import Book
+
+READ_SIZE = 64 * 1024
+
+
+def iter_json_array(stream):
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = stream.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item
+        if not chunk:
+            if position < len(buffer) or not started:
+                raise ValueError('Unexpected end of JSON array')
+            return
+
+
+def iter_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(stream, model_label):
+    for row in csv.DictReader(stream):
+        pk = row.pop('pk', None) or row.pop('id', None) or None
+        yield {'model': model_label, 'pk': pk, 'fields': row, 'blank_is_null': True}
+
+
+def read_records(stream, file_format, model_label=None):
+    if file_format == 'csv':
+        return iter_csv(stream, model_label)
+    if file_format == 'ndjson':
+        return iter_ndjson(stream)
+    return iter_json_array(stream)
+
+
+class CatalogLoader:
+    """
+    Loads fixture-style records ({"model", "pk", "fields"}) in chunks with COPY on PostgreSQL
+    and bulk_create elsewhere. Model save() and signals are skipped, the book counters,
+    search vectors and cached responses are refreshed once in finish().
+    """
+
+    def __init__(self, using='default', chunk_size=5000):
+        self.connection = connections[using]
+        self.using = using
+        self.chunk_size = chunk_size
+        self.pending = defaultdict(list)
+        self.counts = Counter()
+        self.started = time.perf_counter()
+
+    def add(self, record):
+        model = apps.get_model(record['model'])
+        values = {}
+        for name, value in record['fields'].items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                continue
+            if record.get('blank_is_null') and value == '' and not field.empty_strings_allowed:
+                value = None
+            values[field.attname] = value
+        instance = model(**values)
+        if record.get('pk') not in (None, ''):
+            instance.pk = model._meta.pk.to_python(record['pk'])
+        self.pending[model].append(instance)
+        if len(self.pending[model]) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model):
+        instances = self.pending.pop(model, [])
+        if not instances:
+            return
+        if self.connection.vendor == 'postgresql':
+            with_pk = [instance for instance in instances if instance.pk is not None]
+            self.copy(model, with_pk, with_pk=True)
+            self.copy(model, [instance for instance in instances if instance.pk is None], with_pk=False)
+        else:
+            model.objects.using(self.using).bulk_create(instances)
+        self.counts[model._meta.label] += len(instances)
+
+    def copy(self, model, instances, with_pk):
+        if not instances:
+            return
+        fields = [field for field in model._meta.local_concrete_fields if with_pk or not field.primary_key]
+        buffer = io.StringIO()
+        for instance in instances:
+            values = (field.get_db_prep_save(field.to_python(getattr(instance, field.attname)), self.connection)
+                      for field in fields)
+            buffer.write(','.join('' if value is None else '"%s"' % str(value).replace('"', '""')
+                                  for value in values) + '\n')
+        buffer.seek(0)
+        quote = self.connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.cursor.copy_expert(f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                                      buffer)
+
+    def finish(self):
+        for model in list(self.pending):
+            self.flush(model)
+        models = [apps.get_model(label) for label in self.counts]
+        statements = self.connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        if {'store.Book', 'store.UserBookRelation'} & set(self.counts):
+            link_authors(Book.objects.using(self.using).filter(author=None))
+            rebuild_counters(Book.objects.using(self.using))
+            get_search_backend().index(Book.objects.using(self.using).filter(search_vector__isnull=True))
+            invalidate_books()
+        return self.counts
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
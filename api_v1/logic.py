@@ -1,9 +1,335 @@
-from django.db.models import Avg
+from functools import reduce
+from operator import or_
 
-from store.models import UserBookRelation
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Avg, Count, Case, When, Sum, F, FloatField, Subquery, OuterRef, IntegerField, Q, Value, \
+    Window, Exists, Max, Min
+from django.db.models.functions import Cast, Coalesce, NullIf, RowNumber
+from django.utils import timezone
+
+from api_v1.cache import get_cache, invalidate_book
+from api_v1.utils import chunked
+from store.models import Author, Book, UserBookRelation, User, QueuedBookRating, author_key
+
+STAR_FIELDS = {rate: f'stars_{rate}' for rate, _ in UserBookRelation.RATE_CHOICES}
+RATING_PRIOR_KEY = 'books:rating_prior'
+RATING_PRIOR_TIMEOUT = 60 * 60
+
+
+def rating_expression(sum_delta=0, count_delta=0):
+    return Cast(F('rating_sum') + sum_delta, FloatField()) / NullIf(F('rating_count') + count_delta, 0)
+
+
+def weighted_rating_expression(prior, sum_delta=0, count_delta=0):
+    # Bayesian average: BOOKS_RATING_PRIOR_VOTES votes of the catalog mean are added to the book's own,
+    # so one 5 star vote does not outrank hundreds of 4 star ones. Unrated books score 0 and sort last.
+    votes = settings.BOOKS_RATING_PRIOR_VOTES
+    return Case(
+        When(rating_count__gt=-count_delta, then=(
+            (Cast(F('rating_sum') + sum_delta, FloatField()) + votes * prior) / (F('rating_count') + count_delta + votes)
+        )),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def weighted_rating(rating_sum, rating_count, prior):
+    votes = settings.BOOKS_RATING_PRIOR_VOTES
+    return (rating_sum + votes * prior) / (rating_count + votes) if rating_count else 0
+
+
+def catalog_rating(queryset=None):
+    queryset = Book.objects.all() if queryset is None else queryset
+    totals = queryset.aggregate(rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+    return totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else UserBookRelation.THREE
+
+
+def rating_prior():
+    # The catalog mean moves slowly, writes use a cached one and rebuild_book_ratings refreshes it.
+    cache = get_cache()
+    prior = cache.get(RATING_PRIOR_KEY)
+    if prior is None:
+        prior = catalog_rating()
+        cache.set(RATING_PRIOR_KEY, prior, timeout=RATING_PRIOR_TIMEOUT)
+    return prior
+
+
+def relation_delta(rate_before, rate_after, liked_before, liked_after, bookmarked_before=False,
+                   bookmarked_after=False):
+    return {
+        'sum': (rate_after or 0) - (rate_before or 0),
+        'count': (rate_after is not None) - (rate_before is not None),
+        'likes': int(bool(liked_after)) - int(bool(liked_before)),
+        'bookmarks': int(bool(bookmarked_after)) - int(bool(bookmarked_before)),
+    }
+
+
+def apply_relation_delta(book_id, rate_before=None, rate_after=None, liked_before=False, liked_after=False,
+                         bookmarked_before=False, bookmarked_after=False):
+    delta = relation_delta(rate_before, rate_after, liked_before, liked_after, bookmarked_before, bookmarked_after)
+    if not any(delta.values()):
+        return
+    if settings.BOOKS_RATING_DEFERRED:
+        queue_rating(book_id)
+        return
+    counters = {
+        'rating_sum': F('rating_sum') + delta['sum'],
+        'rating_count': F('rating_count') + delta['count'],
+        'likes_total': F('likes_total') + delta['likes'],
+        'bookmarks_total': F('bookmarks_total') + delta['bookmarks'],
+        'rating': rating_expression(delta['sum'], delta['count']),
+    }
+    if delta['sum'] or delta['count']:
+        counters['weighted_rating'] = weighted_rating_expression(rating_prior(), delta['sum'], delta['count'])
+        if rate_before is not None:
+            counters[STAR_FIELDS[rate_before]] = F(STAR_FIELDS[rate_before]) - 1
+        if rate_after is not None:
+            counters[STAR_FIELDS[rate_after]] = F(STAR_FIELDS[rate_after]) + 1
+    Book.objects.filter(pk=book_id).update(**counters)
+    if delta['sum'] or delta['count'] or delta['likes']:
+        Author.objects.filter(books=book_id).update(
+            rating_sum=F('rating_sum') + delta['sum'],
+            rating_count=F('rating_count') + delta['count'],
+            likes_total=F('likes_total') + delta['likes'],
+            rating=rating_expression(delta['sum'], delta['count']),
+        )
+
+
+def queue_rating(*book_ids):
+    # Coalesces: a book already waiting in the queue is not queued twice. Queueing it again moves queued_at,
+    # so a drain that read the old row before this write leaves the new one in the queue.
+    model = QueuedBookRating._meta
+    quote = connection.ops.quote_name
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(model.db_table)} ({quote("book_id")}, {quote("queued_at")}) '
+            f'VALUES {", ".join(["(%s, %s)"] * len(book_ids))} '
+            f'ON CONFLICT ({quote("book_id")}) DO UPDATE SET {quote("queued_at")} = EXCLUDED.{quote("queued_at")}',
+            [value for book_id in book_ids
+             for value in (book_id, connection.ops.adapt_datetimefield_value(timezone.now()))],
+        )
+
+
+def drain_rating_queue(batch_size=500):
+    with transaction.atomic():
+        queued = QueuedBookRating.objects.select_for_update(skip_locked=True).order_by('queued_at')
+        rows = list(queued.values_list('book_id', 'queued_at')[:batch_size])
+        if not rows:
+            return []
+        # Only the rows as they were read, a book queued again meanwhile is drained once more.
+        for chunk in chunked(rows, 100):
+            QueuedBookRating.objects.filter(
+                reduce(or_, [Q(book_id=book_id, queued_at=queued_at) for book_id, queued_at in chunk])
+            ).delete()
+        book_ids = [book_id for book_id, _ in rows]
+        rebuild_counters(Book.objects.filter(pk__in=book_ids))
+    invalidate_book(*book_ids)
+    return book_ids
+
+
+def ensure_relation(user, book_id):
+    # INSERT ... ON CONFLICT DO NOTHING, concurrent first writes of one relation cannot create duplicates.
+    UserBookRelation.objects.bulk_create([UserBookRelation(user=user, book_id=book_id)], ignore_conflicts=True)
 
 
 def set_rating(book):
-    rating = UserBookRelation.objects.filter(book=book).aggregate(rating=Avg('rate')).get('rating')
-    book.rating = rating
-    book.save()
+    counters = UserBookRelation.objects.filter(book=book).aggregate(
+        rating=Avg('rate'),
+        rating_sum=Coalesce(Sum('rate'), 0),
+        rating_count=Count('rate'),
+        likes_total=Count(Case(When(is_liked=True, then=1))),
+        bookmarks_total=Count(Case(When(is_bookmarked=True, then=1))),
+        **{field: Count('pk', filter=Q(rate=rate)) for rate, field in STAR_FIELDS.items()},
+    )
+    counters['weighted_rating'] = weighted_rating(counters['rating_sum'], counters['rating_count'], rating_prior())
+    Book.objects.filter(pk=book.pk).update(**counters)
+    for field, value in counters.items():
+        setattr(book, field, value)
+
+
+def _relations_of_book(**filters):
+    return UserBookRelation.objects.filter(book=OuterRef('pk'), **filters).order_by().values('book')
+
+
+def counters_from_relations():
+    counters = {
+        'rating_sum': Coalesce(Subquery(
+            _relations_of_book().annotate(total=Sum('rate')).values('total'), output_field=IntegerField()
+        ), 0),
+        'rating_count': Coalesce(Subquery(
+            _relations_of_book(rate__isnull=False).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ), 0),
+        'likes_total': Coalesce(Subquery(
+            _relations_of_book(is_liked=True).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ), 0),
+        'bookmarks_total': Coalesce(Subquery(
+            _relations_of_book(is_bookmarked=True).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ), 0),
+    }
+    for rate, field in STAR_FIELDS.items():
+        counters[field] = Coalesce(Subquery(
+            _relations_of_book(rate=rate).annotate(total=Count('pk')).values('total'), output_field=IntegerField()
+        ), 0)
+    return counters
+
+
+def find_counter_drift(queryset=None):
+    queryset = Book.objects.all() if queryset is None else queryset
+    expected = {f'expected_{field}': expression for field, expression in counters_from_relations().items()}
+    drift = Q()
+    for field in counters_from_relations():
+        drift |= ~Q(**{field: F(f'expected_{field}')})
+    return queryset.annotate(**expected).filter(drift).order_by('pk')
+
+
+def rebuild_counters(queryset=None):
+    queryset = Book.objects.all() if queryset is None else queryset
+    updated = queryset.update(**counters_from_relations())
+    queryset.update(rating=rating_expression(), weighted_rating=weighted_rating_expression(rating_prior()))
+    rebuild_author_counters(Author.objects.using(queryset.db).filter(pk__in=queryset.values('author_id')))
+    return updated
+
+
+def rebuild_ratings(using=DEFAULT_DB_ALIAS, batch_size=5000):
+    """
+    Recomputes the star histograms, rating counters, averages and weighted ratings of all books with set-based
+    queries per range of batch_size book ids: the relations of the range are grouped by book once and joined back
+    with UPDATE ... FROM, instead of a correlated subquery per book and counter. Returns the number of books and
+    the catalog mean.
+    """
+    books = Book.objects.using(using)
+    relations = UserBookRelation.objects.using(using).filter(rate__isnull=False).order_by()
+    totals = relations.aggregate(rating_sum=Sum('rate'), rating_count=Count('pk'))
+    prior = totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else UserBookRelation.THREE
+    counters = ['rating_sum', 'rating_count', *STAR_FIELDS.values()]
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(Book._meta.db_table)
+    assignments = ', '.join(f'{quote(field)} = histogram.{quote(field)}' for field in counters)
+    bounds = books.aggregate(first=Min('pk'), last=Max('pk'))
+    updated = 0
+    for start in range(bounds['first'] or 0, (bounds['last'] or -1) + 1, batch_size):
+        batch = books.filter(pk__gte=start, pk__lt=start + batch_size)
+        histograms = relations.filter(book_id__gte=start, book_id__lt=start + batch_size).values('book_id') \
+            .annotate(rating_sum=Sum('rate'), rating_count=Count('pk'),
+                      **{field: Count('pk', filter=Q(rate=rate)) for rate, field in STAR_FIELDS.items()})
+        sql, params = histograms.query.sql_with_params()
+        with transaction.atomic(using):
+            # Locked in pk order like bulk_upsert_relations does, relation writes to these books wait for the
+            # rebuild instead of changing the counters between the histograms and the UPDATE.
+            list(batch.select_for_update(no_key=True).order_by('pk').values_list('pk'))
+            rated = UserBookRelation.objects.filter(book=OuterRef('pk'), rate__isnull=False)
+            batch.filter(reduce(or_, [Q(**{f'{field}__gt': 0}) for field in counters])).filter(~Exists(rated)) \
+                .update(**{field: 0 for field in counters})
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET {assignments} '
+                    f'FROM ({sql}) histogram WHERE {table}.{quote("id")} = histogram.{quote("book_id")}',
+                    params,
+                )
+            updated += batch.update(rating=rating_expression(), weighted_rating=weighted_rating_expression(prior))
+    with transaction.atomic(using):
+        rebuild_author_counters(Author.objects.using(using))
+    get_cache().set(RATING_PRIOR_KEY, prior, timeout=RATING_PRIOR_TIMEOUT)
+    return updated, prior
+
+
+def _books_of_author(**filters):
+    return Book.objects.filter(author=OuterRef('pk'), **filters).order_by().values('author')
+
+
+def author_counters_from_books():
+    counters = {'books_count': Count('pk')}
+    counters.update({field: Sum(field) for field in ('rating_sum', 'rating_count', 'likes_total')})
+    return {
+        field: Coalesce(Subquery(_books_of_author().annotate(total=total).values('total'),
+                                 output_field=IntegerField()), 0)
+        for field, total in counters.items()
+    }
+
+
+def rebuild_author_counters(queryset=None):
+    queryset = Author.objects.all() if queryset is None else queryset
+    updated = queryset.update(**author_counters_from_books())
+    queryset.update(rating=rating_expression())
+    return updated
+
+
+def link_authors(queryset, chunk_size=500):
+    """
+    Points books at the authors of their author_name, creating missing authors, for books written
+    without Book.save() (bulk_create, bulk_update, COPY). Returns the number of linked books.
+    """
+    names = {}
+    for name in queryset.order_by().values_list('author_name', flat=True).distinct():
+        names.setdefault(author_key(name), []).append(name)
+    affected = set(queryset.exclude(author=None).order_by().values_list('author_id', flat=True).distinct())
+    linked = 0
+    authors_of_db = Author.objects.using(queryset.db)
+    for chunk in chunked(names.items(), chunk_size):
+        authors_of_db.bulk_create([Author(key=key, name=' '.join(spellings[0].split())) for key, spellings in chunk],
+                                   ignore_conflicts=True)
+        authors = dict(authors_of_db.filter(key__in=[key for key, _ in chunk]).values_list('key', 'pk'))
+        spellings = {name: authors[key] for key, names_of_key in chunk for name in names_of_key}
+        linked += queryset.filter(author_name__in=list(spellings)).update(author_id=Case(
+            *[When(author_name=name, then=Value(pk)) for name, pk in spellings.items()], output_field=IntegerField()
+        ))
+        affected.update(authors.values())
+    rebuild_author_counters(authors_of_db.filter(pk__in=affected))
+    return linked
+
+
+LEADERBOARDS = {
+    'most_liked': (Q(likes_total__gt=0), ('-likes_total', 'pk')),
+    'most_bookmarked': (Q(bookmarks_total__gt=0), ('-bookmarks_total', 'pk')),
+    # Weighted, so a single vote cannot top the board.
+    'top_rated': (Q(weighted_rating__gt=0), ('-weighted_rating', 'pk')),
+}
+
+
+def leaderboard(queryset, board, size):
+    # Served by the store_book_*_idx indexes: reads the first size entries, the counters are kept
+    # up to date on every relation change and reconciled by rebuild_book_counters.
+    condition, ordering = LEADERBOARDS[board]
+    return queryset.filter(condition).order_by(*ordering)[:size]
+
+
+def reader_samples(book_ids, size):
+    samples = {book_id: ([], 0) for book_id in book_ids}
+    if not samples:
+        return samples
+    relations = UserBookRelation.objects.filter(book_id__in=list(samples)).annotate(
+        sample_book=F('book_id'),
+        reader_id=F('user_id'),
+        reader_first_name=F('user__first_name'),
+        reader_last_name=F('user__last_name'),
+        sample_position=Window(RowNumber(), partition_by=[F('book_id')], order_by=F('pk').asc()),
+        sample_total=Window(Count('pk'), partition_by=[F('book_id')]),
+    ).values('sample_book', 'reader_id', 'reader_first_name', 'reader_last_name', 'sample_position',
+             'sample_total')
+    sql, params = relations.query.sql_with_params()
+    with connections[relations.db].cursor() as cursor:
+        cursor.execute(
+            f'SELECT sample_book, reader_id, reader_first_name, reader_last_name, sample_total '
+            f'FROM ({sql}) sample WHERE sample_position <= %s ORDER BY sample_book, sample_position',
+            (*params, size),
+        )
+        for book_id, reader_id, first_name, last_name, total in cursor.fetchall():
+            readers, _ = samples[book_id]
+            readers.append({'id': reader_id, 'first_name': first_name, 'last_name': last_name})
+            samples[book_id] = (readers, total)
+    return samples
+
+
+def attach_reader_samples(books, size):
+    samples = reader_samples([book.pk for book in books], size)
+    for book in books:
+        readers, book.readers_count = samples[book.pk]
+        book.reader_sample = [User(**reader) for reader in readers]
@@ -0,0 +1,106 @@
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from api_v1.bench import REQUEST_MIX, generate_requests, read_requests, replay, seed_catalog, summarize
+from api_v1.cache import get_cache
+from store.models import User
+
+
+def parse_mix(value):
+    try:
+        mix = {label: int(weight) for label, weight in (part.split('=') for part in value.split(','))}
+    except ValueError:
+        raise CommandError(f'Invalid mix {value!r}, expected e.g. list=40,rate=10')
+    unknown = set(mix) - set(REQUEST_MIX)
+    if unknown:
+        raise CommandError(f'Unknown request kinds: {", ".join(sorted(unknown))}')
+    return mix
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic catalog and replay a generated request mix or recorded requests against the API '
+            'in process, reporting throughput, latency percentiles and queries per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--relations', type=int, default=100_000)
+        parser.add_argument('--requests', type=int, default=1_000)
+        parser.add_argument('--mix', type=parse_mix, default=REQUEST_MIX,
+                            help='Weights of the generated requests, e.g. list=40,search=20,order=15,filter=15,rate=10')
+        parser.add_argument('--replay', help='JSON lines file with recorded requests to send instead of the mix')
+        parser.add_argument('--cold', action='store_true', help='Clear the response cache before every request')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Store the results as JSON, e.g. to compare them across commits')
+        parser.add_argument('--compare', help='Results stored by an earlier run to print the differences against')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            self.stdout.write('Seeding catalog...')
+            book_ids = seed_catalog(options['books'], options['users'], options['relations'], seed=options['seed'])
+            if options['replay']:
+                requests = list(read_requests(options['replay']))
+            else:
+                requests = list(generate_requests(options['mix'], options['requests'], book_ids, options['seed']))
+            client = Client()
+            client.force_login(User.objects.filter(username__startswith='bench_user_').latest('pk'))
+            if options['cold']:
+                requests = self.cold(requests)
+            get_cache().clear()
+            started = time.perf_counter()
+            results = replay(client, requests)
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        report = {
+            'commit': current_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'options': {name: options[name] for name in ('books', 'users', 'relations', 'mix', 'replay', 'cold')},
+            'requests': len(results),
+            'rps': round(len(results) / elapsed, 1),
+            'endpoints': summarize(results),
+        }
+        self.write_report(report, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+    @staticmethod
+    def cold(requests):
+        for request in requests:
+            get_cache().clear()
+            yield request
+
+    def write_report(self, report, baseline):
+        self.stdout.write(f'commit={report["commit"]} requests={report["requests"]} rps={report["rps"]}')
+        previous = baseline['endpoints'] if baseline else {}
+        for label, stats in report['endpoints'].items():
+            line = (f'{label:<40} requests={stats["requests"]} errors={stats["errors"]} rps={stats["rps"]} '
+                    f'p50={stats["p50_ms"]:.2f}ms p95={stats["p95_ms"]:.2f}ms p99={stats["p99_ms"]:.2f}ms '
+                    f'queries={stats["queries"]}')
+            if label in previous:
+                old = previous[label]
+                changes = [f'{name}={(stats[name] - old[name]) / old[name] * 100:+.1f}%'
+                           for name in ('p50_ms', 'p95_ms', 'p99_ms') if old[name]]
+                changes.append(f'queries={stats["queries"] - old["queries"]:+.2f}')
+                line += f' vs {baseline["commit"]}: {" ".join(changes)}'
+            self.stdout.write(line)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Case, When, ExpressionWrapper, F, DecimalField, Subquery, OuterRef
+
+from api_v1.bench import seed_catalog, time_queryset
+from api_v1.views import BookViewSet
+from store.models import Book, User
+
+
+def aggregated_books():
+    return Book.objects.annotate(
+        likes_count=Count(Case(When(userbookrelation__is_liked=True, then=1))),
+        discounted_price=ExpressionWrapper(F('price') - F('discount'), output_field=DecimalField()),
+        owner_name=Subquery(User.objects.filter(id=OuterRef('owner_id')).values('username'))
+    ).order_by('pk')
+
+
+class Command(BaseCommand):
+    help = 'Compare the aggregated and the precomputed book list queries on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--relations', type=int, default=10_000_000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of rolling back')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write('Seeding catalog...')
+            seed_catalog(options['books'], options['users'], options['relations'])
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            querysets = {
+                'aggregated': aggregated_books(),
+                'precomputed': BookViewSet.queryset.prefetch_related(None),
+            }
+            for label, queryset in querysets.items():
+                for ordering in ('pk', '-price'):
+                    timings = time_queryset(queryset.order_by(ordering), options['repeat'], options['page_size'])
+                    self.stdout.write(
+                        f'{label:<12} order_by={ordering:<7} '
+                        f'min={timings[0] * 1000:.2f}ms median={timings[len(timings) // 2] * 1000:.2f}ms'
+                    )
+            if not options['keep']:
+                transaction.set_rollback(True)
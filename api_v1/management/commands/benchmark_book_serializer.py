@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_v1.bench import seed_catalog, time_call
+from api_v1.serializers import BookListSerializer, BookRowSerializer
+from api_v1.views import book_queryset
+
+
+class Command(BaseCommand):
+    help = 'Compare BookListSerializer with the values() row serializer on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=5_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--relations', type=int, default=50_000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--fields', help='Comma separated sparse fieldset for the row serializer')
+
+    def handle(self, *args, **options):
+        size = options['page_size']
+        fields = tuple(options['fields'].split(',')) if options['fields'] else None
+        row_serializer = BookRowSerializer.for_fields(fields)
+        with transaction.atomic():
+            seed_catalog(options['books'], options['users'], options['relations'])
+            queryset = book_queryset(readers=False)
+            books = list(queryset[:size])
+            rows = list(queryset.values(*row_serializer.columns)[:size])
+            cases = {
+                'serializer': lambda: BookListSerializer(books, many=True).data,
+                'rows': lambda: row_serializer.to_representation(rows),
+                'serializer+query': lambda: BookListSerializer(list(queryset[:size]), many=True).data,
+                'rows+query': lambda: row_serializer.to_representation(
+                    list(queryset.values(*row_serializer.columns)[:size])
+                ),
+            }
+            for label, func in cases.items():
+                timings = time_call(func, options['repeat'])
+                self.stdout.write(f'{label:<18} min={timings[0] * 1000:.2f}ms '
+                                  f'median={timings[len(timings) // 2] * 1000:.2f}ms')
+            transaction.set_rollback(True)
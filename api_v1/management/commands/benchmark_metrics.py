@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+
+from api_v1.bench import seed_catalog, time_call
+from api_v1.cache import get_cache
+
+MIDDLEWARE = 'api_v1.metrics.MetricsMiddleware'
+
+
+def client_with(middleware):
+    client = Client()
+    with override_settings(MIDDLEWARE=middleware):
+        # The client builds its middleware chain on the first request and keeps it.
+        client.get('/api/v1/book/')
+    return client
+
+
+class Command(BaseCommand):
+    help = 'Measure the overhead of MetricsMiddleware on book list requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--relations', type=int, default=10_000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=9)
+
+    def handle(self, *args, **options):
+        without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            seed_catalog(options['books'], options['users'], options['relations'])
+            clients = {'without': client_with(without), 'with': client_with([MIDDLEWARE] + without)}
+            for cached in (False, True):
+                timings = {label: [] for label in clients}
+                # Modes alternate so drift in the machine load hits both of them alike.
+                for _ in range(options['repeat']):
+                    for label, client in clients.items():
+                        def run():
+                            for page in range(options['requests']):
+                                if not cached:
+                                    get_cache().clear()
+                                response = client.get('/api/v1/book/', {'page': page % 10 + 1})
+                                assert response.status_code == 200, response.status_code
+                        timings[label] += time_call(run, 1)
+                medians = {label: sorted(values)[len(values) // 2] / options['requests']
+                           for label, values in timings.items()}
+                overhead = (medians['with'] - medians['without']) / medians['without'] * 100
+                self.stdout.write(
+                    f'{"cached" if cached else "uncached":<9} without={medians["without"] * 1000:.3f}ms '
+                    f'with={medians["with"] * 1000:.3f}ms overhead={overhead:+.2f}%'
+                )
+            transaction.set_rollback(True)
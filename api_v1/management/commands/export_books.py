@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.export import EXPORT_FORMATS, export_books
+from api_v1.views import BookViewSet
+
+
+class Command(BaseCommand):
+    help = 'Stream the annotated book catalog as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', help='File to write to, stdout by default')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        chunks = export_books(BookViewSet.queryset, options['format'], options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            output.writelines(chunks)
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+
+from api_v1.bench import percentile
+
+
+def fetch(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            response.read()
+            code = response.status
+    except HTTPError as exc:
+        code = exc.code
+    return code, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = ('Send concurrent GET requests to a running server, e.g. to compare '
+            'books.asgi:application (uvicorn) with books.wsgi:application (gunicorn)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        for url in options['urls']:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                results = list(executor.map(lambda _: fetch(url, options['timeout']), range(options['requests'])))
+            elapsed = time.perf_counter() - started
+            timings = sorted(timing * 1000 for _, timing in results)
+            errors = sum(code >= 400 for code, _ in results)
+            self.stdout.write(
+                f'{url} requests={len(results)} errors={errors} rps={len(results) / elapsed:.1f} '
+                f'p50={percentile(timings, 0.5):.2f}ms p95={percentile(timings, 0.95):.2f}ms '
+                f'p99={percentile(timings, 0.99):.2f}ms'
+            )
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from api_v1.queries import QueryDetector
+from books.db.connections import stats as connection_stats
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = ContextVar('books_request_metrics', default=None)
+
+
+# One lock for all histograms, a request records all of its observations in a single critical section.
+_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, *label_values):
+        with _lock:
+            self.add(value, label_values)
+
+    def add(self, value, label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with _lock:
+            series = [(label_values, list(counts), total) for label_values, (counts, total) in self.series.items()]
+        for label_values, counts, total in sorted(series):
+            labels = ','.join(f'{name}="{escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_duration = Histogram('books_request_duration_seconds', 'Time spent handling a request.',
+                             ('view', 'method', 'status'), LATENCY_BUCKETS)
+db_queries = Histogram('books_request_db_queries', 'Database queries run by a request.',
+                       ('view', 'method'), QUERY_BUCKETS)
+db_duration = Histogram('books_request_db_duration_seconds', 'Time a request spent in database queries.',
+                        ('view', 'method'), LATENCY_BUCKETS)
+serializer_duration = Histogram('books_request_serializer_duration_seconds', 'Time a request spent serializing.',
+                                ('view', 'method'), LATENCY_BUCKETS)
+response_size = Histogram('books_response_size_bytes', 'Size of non-streaming response bodies.',
+                          ('view', 'method'), SIZE_BUCKETS)
+HISTOGRAMS = [request_duration, db_queries, db_duration, serializer_duration, response_size]
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'queries', 'db', 'serializer', 'serializing', 'detector')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.serializing = False
+        self.detector = QueryDetector() if settings.BOOKS_QUERY_DETECTOR else None
+
+
+@contextmanager
+def timed_serializer():
+    # Nested serializers, e.g. a list serializer and its children, are counted once.
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer += time.perf_counter() - started
+        metrics.serializing = False
+
+
+def time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.queries += 1
+        metrics.db += duration
+        if metrics.detector is not None:
+            metrics.detector.record(sql, duration)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count and time, serializer time and response size of api_v1 views
+    into the histograms served by metrics(), and reports them in a Server-Timing header.
+    Works without a thread hop under ASGI, queries run in sync_to_async threads are counted too.
+    With BOOKS_QUERY_DETECTOR on, repeated query shapes and slow queries are reported as well.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    @staticmethod
+    def record(request, response, metrics):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or match.app_name != 'api_v1':
+            return response
+        elapsed = time.perf_counter() - metrics.started
+        labels = (match.view_name, request.method)
+        with _lock:
+            request_duration.add(elapsed, labels + (str(response.status_code),))
+            db_queries.add(metrics.queries, labels)
+            db_duration.add(metrics.db, labels)
+            serializer_duration.add(metrics.serializer, labels)
+            if not response.streaming:
+                response_size.add(len(response.content), labels)
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db * 1000:.2f};desc="{metrics.queries} queries", '
+            f'serializer;dur={metrics.serializer * 1000:.2f}, total;dur={elapsed * 1000:.2f}'
+        )
+        if metrics.detector is not None:
+            metrics.detector.report(match.view_name)
+        return response
+
+
+def expose_connection_stats():
+    lines = [
+        '# HELP books_db_connection_checkouts_total Database connection checkouts by result.',
+        '# TYPE books_db_connection_checkouts_total counter',
+    ]
+    snapshot = connection_stats.snapshot()
+    for alias, counts in sorted(snapshot.items()):
+        for result in ('hits', 'misses'):
+            lines.append(f'books_db_connection_checkouts_total{{alias="{alias}",result="{result}"}} '
+                         f'{counts[result]}')
+    lines += [
+        '# HELP books_db_connection_health_check_failures_total Reused connections that failed the health check.',
+        '# TYPE books_db_connection_health_check_failures_total counter',
+    ]
+    for alias, counts in sorted(snapshot.items()):
+        lines.append(f'books_db_connection_health_check_failures_total{{alias="{alias}"}} '
+                     f'{counts["health_check_failures"]}')
+    lines += [
+        '# HELP books_db_connection_wait_seconds_total Time spent checking out database connections.',
+        '# TYPE books_db_connection_wait_seconds_total counter',
+    ]
+    for alias, counts in sorted(snapshot.items()):
+        lines.append(f'books_db_connection_wait_seconds_total{{alias="{alias}"}} {counts["wait_seconds_total"]}')
+    return lines
+
+
+def metrics(request):
+    # Scrapers authenticate with the token, without one only staff sessions may read the metrics.
+    token = settings.BOOKS_METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    if not token and not request.user.is_staff:
+        return HttpResponseForbidden()
+    lines = [line for histogram in HISTOGRAMS for line in histogram.expose()] + expose_connection_stats()
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class BookPageNumberPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seeks past the last row of the previous page instead of using OFFSET and never runs COUNT(*).
+    Works with any ordering set by OrderingFilter, pk is the tiebreaker and NULLs sort last.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_keys(queryset)
+        self.nullable = {name for name, _ in self.keys if self.is_nullable(queryset.model, name)}
+        position, reverse = self.decode_cursor(request)
+
+        if position is not None:
+            queryset = queryset.filter(self.seek(position, reverse))
+        queryset = queryset.order_by(*self.order_by(reverse))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.first_position = self.get_position(results[0]) if results else position
+        self.last_position = self.get_position(results[-1]) if results else position
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_keys(self, queryset):
+        keys = []
+        for field in queryset.query.order_by:
+            if not isinstance(field, str):
+                raise NotFound('Keyset pagination supports only plain field ordering')
+            name = field.lstrip('-')
+            if name in ('pk', 'id'):
+                return keys + [('pk', field.startswith('-'))]
+            keys.append((name, field.startswith('-')))
+        return keys + [('pk', self.pk_descending(queryset.model, keys))]
+
+    @staticmethod
+    def pk_descending(model, keys):
+        # The tiebreaker runs the way an index on the keys and id is read, forwards or backwards,
+        # e.g. (author_name, id) serves author_name DESC, id DESC but not author_name DESC, id ASC.
+        names = [name for name, _ in keys]
+        for index in model._meta.indexes:
+            fields = [(field.lstrip('-'), field.startswith('-')) for field in index.fields]
+            if [name for name, _ in fields] != names + ['id']:
+                continue
+            flipped = {descending != index_descending for (_, descending), (_, index_descending) in zip(keys, fields)}
+            if len(flipped) == 1:
+                return fields[-1][1] != flipped.pop()
+        return bool(keys) and keys[0][1]
+
+    @staticmethod
+    def is_nullable(model, name):
+        if name == 'pk':
+            return False
+        try:
+            return model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return True
+
+    def order_by(self, reverse):
+        # NULLS FIRST/LAST only where needed, the modifier keeps the planner from using a plain btree index.
+        ordering = []
+        for name, descending in self.keys:
+            order = F(name).desc if descending != reverse else F(name).asc
+            if name in self.nullable:
+                ordering.append(order(nulls_last=not reverse, nulls_first=reverse))
+            else:
+                ordering.append(order())
+        return ordering
+
+    def seek(self, position, reverse):
+        conditions = []
+        for index, (name, descending) in enumerate(self.keys):
+            ties = [self.equal(key, value) for (key, _), value in zip(self.keys[:index], position)]
+            conditions.append(reduce(and_, ties + [self.beyond(name, descending, position[index], reverse)]))
+        return reduce(or_, conditions)
+
+    @staticmethod
+    def equal(name, value):
+        return Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+    def beyond(self, name, descending, value, reverse):
+        if value is None:
+            return Q(**{f'{name}__isnull': False}) if reverse else Q(pk__in=[])
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition = Q(**{f'{name}__{lookup}': value})
+        if reverse or name not in self.nullable:
+            return condition
+        return condition | Q(**{f'{name}__isnull': True})
+
+    def get_position(self, obj):
+        if isinstance(obj, dict):
+            return [obj['id' if name == 'pk' else name] for name, _ in self.keys]
+        return [getattr(obj, name) for name, _ in self.keys]
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, cls=DjangoJSONEncoder)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            position, reverse = payload['p'], bool(payload['r'])
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class BookPagination(BasePagination):
+    """
+    Page number pagination by default, keyset pagination when the client asks
+    for it with `?pagination=cursor` or follows a cursor link.
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.page_number = BookPageNumberPagination()
+        self.keyset = KeysetPagination(self.page_number.page_size)
+        self.delegate = self.page_number
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == 'cursor' or \
+                self.keyset.cursor_query_param in request.query_params:
+            self.delegate = self.keyset
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number.get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" for keyset pagination without a total count.',
+                'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+            },
+            {
+                'name': self.keyset.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,68 @@
+import logging
+import re
+import traceback
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NUMBER = re.compile(r'\b\d+\b')
+PLACEHOLDERS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+INSTRUMENTATION = {str(Path(__file__)), str(Path(__file__).with_name('metrics.py'))}
+
+
+class QueryProblems(Exception):
+    pass
+
+
+def normalize(sql):
+    # Queries that only differ in literals or in the length of an IN (...) list have the same shape.
+    return PLACEHOLDERS.sub('(...)', NUMBER.sub('?', sql))
+
+
+def origin():
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename and \
+                frame.filename not in INSTRUMENTATION:
+            return f'{Path(frame.filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryDetector:
+    """
+    Groups the queries of one request by shape to spot N+1 patterns and collects the ones
+    over the latency budget. The stack is only walked for queries that get reported.
+    """
+
+    def __init__(self):
+        self.repeat_threshold = settings.BOOKS_QUERY_REPEAT_THRESHOLD
+        self.slow_seconds = settings.BOOKS_SLOW_QUERY_MS / 1000
+        self.shapes = defaultdict(int)
+        self.origins = {}
+        self.slow = []
+
+    def record(self, sql, duration):
+        shape = normalize(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.repeat_threshold:
+            self.origins[shape] = origin()
+        if duration >= self.slow_seconds:
+            self.slow.append((sql, duration, origin()))
+
+    def problems(self):
+        problems = [
+            f'{count} queries of the same shape from {self.origins[shape]}: {shape}'
+            for shape, count in self.shapes.items() if count >= self.repeat_threshold
+        ]
+        problems += [f'slow query ({duration * 1000:.1f}ms) from {where}: {sql}' for sql, duration, where in self.slow]
+        return problems
+
+    def report(self, view):
+        problems = self.problems()
+        for problem in problems:
+            logger.warning('%s: %s', view, problem)
+        if problems and settings.BOOKS_QUERY_DETECTOR_RAISE:
+            raise QueryProblems(f'{view}: ' + '\n'.join(problems))
@@ -0,0 +1,117 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api_v1.cache import get_cache
+
+_replica_reads = ContextVar('books_replica_reads', default=None)
+_unavailable = {}
+PIN_WINDOW_KEY = 'books:primary:any'
+
+
+def pinned_key(user_id):
+    return f'books:primary:{user_id}'
+
+
+def pin_to_primary(*user_ids):
+    # Replication lag would otherwise hide a user's own rating or like from them for a moment.
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        pins = {pinned_key(user_id): True for user_id in user_ids}
+        get_cache().set_many({**pins, PIN_WINDOW_KEY: True}, timeout=settings.BOOKS_REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(get_cache().get(pinned_key(user.pk)))
+
+
+def pin_window_open():
+    # Some write happened less than BOOKS_REPLICA_STICKY_SECONDS ago, replicas may not have it yet.
+    return bool(get_cache().get(PIN_WINDOW_KEY))
+
+
+def replica_available(alias):
+    if _unavailable.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unavailable[alias] = time.monotonic() + settings.BOOKS_REPLICA_RETRY_SECONDS
+        return False
+    _unavailable.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    replicas = list(settings.BOOKS_READ_REPLICAS)
+    random.shuffle(replicas)
+    return next((alias for alias in replicas if replica_available(alias)), None)
+
+
+def read_database():
+    state = _replica_reads.get()
+    if state is None:
+        return None
+    if 'alias' not in state:
+        state['alias'] = choose_replica()
+    return state['alias']
+
+
+def reading_replica():
+    state = _replica_reads.get()
+    return bool(state and state.get('alias'))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.BOOKS_READ_REPLICAS else None
+
+
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        token = _replica_reads.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.pinned_to_primary = False
+        if settings.BOOKS_READ_REPLICAS and request.method in SAFE_METHODS:
+            self.pinned_to_primary = is_pinned(request.user)
+            if not self.pinned_to_primary:
+                _replica_reads.set({})
+
+    def cache_reads(self, request):
+        # A response cached from a lagging replica under the versions bumped by the user's own write
+        # would hide that write, so pinned users skip the response cache.
+        return not self.pinned_to_primary
+
+    def cache_writes(self, request):
+        # While a pin window is open a replica may still miss the write that bumped the versions.
+        return not (reading_replica() and pin_window_open())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        # Bound explicitly so streamed responses, evaluated after dispatch returns, stay on the replica too.
+        queryset = super().filter_queryset(queryset)
+        alias = read_database()
+        return queryset if alias is None else queryset.using(alias)
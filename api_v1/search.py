@@ -0,0 +1,134 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, When, Value, FloatField, F
+from rest_framework.filters import SearchFilter
+
+from store.models import Book
+
+SEARCH_CONFIG = 'simple'
+FIELD_WEIGHTS = {'name': 1.0, 'author_name': 0.4}
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class PostgresSearchBackend:
+    vector = SearchVector('name', weight='A', config=SEARCH_CONFIG) + \
+        SearchVector('author_name', weight='B', config=SEARCH_CONFIG)
+
+    def index(self, queryset):
+        queryset.update(search_vector=self.vector)
+
+    def remove(self, pk):
+        pass
+
+    def search(self, queryset, terms):
+        tokens = [token for term in terms for token in tokenize(term)]
+        if not tokens:
+            return queryset
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', 'pk')
+
+
+class InvertedIndexSearchBackend:
+    """
+    In-process inverted index used when the database has no full-text search, e.g. SQLite test runs.
+    It is built lazily from the database and kept up to date by the Book signals of this process only.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = None
+        self.documents = {}
+        self.tokens = []
+
+    def build(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.tokens = []
+        for book in Book.objects.only('pk', 'name', 'author_name').iterator():
+            self.add(book)
+
+    def add(self, book):
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(book, field)):
+                weights[token] = max(weights[token], weight)
+        self.discard(book.pk)
+        self.documents[book.pk] = weights
+        for token, weight in weights.items():
+            if token not in self.postings:
+                insort(self.tokens, token)
+            self.postings[token][book.pk] = weight
+
+    def discard(self, pk):
+        for token in self.documents.pop(pk, {}):
+            self.postings[token].pop(pk, None)
+
+    def index(self, queryset):
+        with self.lock:
+            if self.postings is None:
+                return
+            for book in queryset.only('pk', 'name', 'author_name'):
+                self.add(book)
+
+    def remove(self, pk):
+        with self.lock:
+            if self.postings is not None:
+                self.discard(pk)
+
+    def prefixed(self, prefix):
+        index = bisect_left(self.tokens, prefix)
+        while index < len(self.tokens) and self.tokens[index].startswith(prefix):
+            yield self.tokens[index]
+            index += 1
+
+    def match(self, token):
+        scores = {}
+        for indexed in self.prefixed(token):
+            for pk, weight in self.postings[indexed].items():
+                scores[pk] = max(scores.get(pk, 0), weight)
+        return scores
+
+    def search(self, queryset, terms):
+        tokens = [token for term in terms for token in tokenize(term)]
+        if not tokens:
+            return queryset
+        with self.lock:
+            if self.postings is None:
+                self.build()
+            scores = None
+            for token in tokens:
+                matched = self.match(token)
+                scores = matched if scores is None else {
+                    pk: score + matched[pk] for pk, score in scores.items() if pk in matched
+                }
+        if not scores:
+            return queryset.none()
+        return queryset.filter(pk__in=scores).annotate(search_rank=Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()], output_field=FloatField()
+        )).order_by('-search_rank', 'pk')
+
+
+postgres_backend = PostgresSearchBackend()
+inverted_index_backend = InvertedIndexSearchBackend()
+
+
+def get_search_backend():
+    return postgres_backend if connection.vendor == 'postgresql' else inverted_index_backend
+
+
+class BookSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend().search(queryset, terms)
@@ -1,29 +1,159 @@
+from functools import lru_cache
+
+from django.conf import settings
 from rest_framework import serializers
 
-from store.models import Book, UserBookRelation, User
+from api_v1.logic import STAR_FIELDS, attach_reader_samples, reader_samples
+from api_v1.metrics import timed_serializer
+from store.models import Author, Book, SimilarBook, UserBookRelation, User
+
+
+class TimedDataMixin:
+    @property
+    def data(self):
+        with timed_serializer():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'first_name', 'last_name')
+        list_serializer_class = TimedListSerializer
 
 
-class BookSerializer(serializers.ModelSerializer):
+class RatingHistogramField(serializers.Field):
+    # Numbers of 1 to 5 star rates as a list.
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, book):
+        return [getattr(book, field) for field in STAR_FIELDS.values()]
+
+
+class BookSerializer(TimedDataMixin, serializers.ModelSerializer):
     likes_count = serializers.IntegerField(read_only=True)
     rating = serializers.DecimalField(read_only=True, max_digits=3, decimal_places=2)
     discounted_price = serializers.DecimalField(read_only=True, max_digits=7, decimal_places=2)
     owner_name = serializers.CharField(read_only=True)
+    weighted_rating = serializers.DecimalField(read_only=True, max_digits=3, decimal_places=2)
+    rating_histogram = RatingHistogramField()
     readers = UserSerializer(many=True, read_only=True)
 
     class Meta:
         model = Book
         fields = (
-            'id', 'name', 'price', 'author_name', 'likes_count', 'rating', 'discounted_price', 'owner_name', 'readers'
+            'id', 'name', 'price', 'author_name', 'likes_count', 'rating', 'discounted_price', 'owner_name',
+            'weighted_rating', 'rating_histogram', 'readers'
         )
+        list_serializer_class = TimedListSerializer
+
+
+class ReaderSampleListSerializer(TimedListSerializer):
+    def to_representation(self, data):
+        books = list(data)
+        attach_reader_samples(books, settings.BOOKS_READERS_SAMPLE_SIZE)
+        return super().to_representation(books)
+
+
+class BookListSerializer(BookSerializer):
+    readers = UserSerializer(source='reader_sample', many=True, read_only=True)
+    readers_count = serializers.IntegerField(read_only=True)
+
+    class Meta(BookSerializer.Meta):
+        fields = BookSerializer.Meta.fields + ('readers_count',)
+        list_serializer_class = ReaderSampleListSerializer
+
+
+class BookRowSerializer:
+    """
+    Read-only fast path for list pages: renders `.values()` rows into the same output as
+    BookListSerializer, with the per-field renderers resolved once per field set.
+    """
+
+    def __init__(self, fields):
+        declared = BookListSerializer().fields
+        self.renderers = [(name, self.compile(declared[name])) for name in fields
+                          if name not in ('rating_histogram', 'readers', 'readers_count')]
+        self.histogram = 'rating_histogram' in fields
+        self.sample_fields = [name for name in fields if name in ('readers', 'readers_count')]
+        self.columns = ['id'] + [name for name, _ in self.renderers if name != 'id']
+        if self.histogram:
+            self.columns += STAR_FIELDS.values()
+
+    @classmethod
+    @lru_cache(maxsize=64)
+    def for_fields(cls, fields=None):
+        return cls(fields or BookListSerializer.Meta.fields)
 
+    @staticmethod
+    def compile(field):
+        if isinstance(field, serializers.DecimalField):
+            return field.to_representation
+        return None
+
+    def to_representation(self, rows):
+        samples = {}
+        if self.sample_fields:
+            samples = reader_samples([row['id'] for row in rows], settings.BOOKS_READERS_SAMPLE_SIZE)
+        data = []
+        for row in rows:
+            item = {}
+            for name, render in self.renderers:
+                value = row[name]
+                item[name] = value if render is None or value is None else render(value)
+            if self.histogram:
+                item['rating_histogram'] = [row[field] for field in STAR_FIELDS.values()]
+            if samples:
+                readers, readers_count = samples[row['id']]
+                for name in self.sample_fields:
+                    item[name] = readers if name == 'readers' else readers_count
+            data.append(item)
+        return data
+
+
+class LeaderboardBookSerializer(TimedDataMixin, serializers.ModelSerializer):
+    likes_count = serializers.IntegerField(source='likes_total')
+    bookmarks_count = serializers.IntegerField(source='bookmarks_total')
 
-class UserBookRelationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Book
+        fields = ('id', 'name', 'author_name', 'price', 'rating', 'weighted_rating', 'rating_count', 'likes_count',
+                  'bookmarks_count')
+        list_serializer_class = TimedListSerializer
+
+
+class AuthorSerializer(TimedDataMixin, serializers.ModelSerializer):
+    likes_count = serializers.IntegerField(source='likes_total')
+
+    class Meta:
+        model = Author
+        fields = ('id', 'name', 'books_count', 'rating', 'likes_count')
+        list_serializer_class = TimedListSerializer
+
+
+class UserBookRelationSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = UserBookRelation
         fields = ('book', 'is_liked', 'is_bookmarked', 'rate',)
+        list_serializer_class = TimedListSerializer
+
+
+class UserBookRelationBulkSerializer(UserBookRelationSerializer):
+    book = serializers.IntegerField(min_value=1)
+
+
+class SimilarBookSerializer(TimedDataMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='similar_id')
+    name = serializers.CharField(source='similar.name')
+    author_name = serializers.CharField(source='similar.author_name')
+    price = serializers.DecimalField(source='similar.price', max_digits=7, decimal_places=2)
+
+    class Meta:
+        model = SimilarBook
+        fields = ('id', 'name', 'author_name', 'price', 'score')
+        list_serializer_class = TimedListSerializer
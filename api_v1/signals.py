@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from api_v1.cache import invalidate_book, invalidate_books
+from api_v1.metrics import install_query_timer
+from api_v1.search import get_search_backend
+from store.models import Book, UserBookRelation, User
+
+
+def invalidate(func, *args):
+    # Once now for this thread and once more after commit, so a response cached
+    # by another request from pre-commit data does not survive the write.
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, **kwargs):
+    invalidate(invalidate_book, instance.pk)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'name', 'author_name'} & set(update_fields):
+        get_search_backend().index(Book.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=UserBookRelation)
+@receiver(post_delete, sender=UserBookRelation)
+def relation_changed(sender, instance, **kwargs):
+    invalidate(invalidate_book, instance.book_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Cached books show owner_name and the readers' names, e.g. the last_login update of a login changes neither.
+    if update_fields is None or {'username', 'first_name', 'last_name'} & set(update_fields):
+        invalidate(invalidate_books)
+
+
+connection_created.connect(install_query_timer)
@@ -0,0 +1,129 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import Coalesce
+
+from api_v1.utils import chunked
+from store.models import SimilarBook, SimilarityFingerprint, UserBookRelation
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+LOAD_CHUNK_SIZE = 100_000
+
+
+def relation_matrix():
+    """
+    Loads all relations into a users x books sparse matrix. A like counts 1, a bookmark 0.5 and
+    a rating from -1 (1 star) to 1 (5 stars), so a low rating pulls books apart.
+    Returns the matrix, the book ids of its columns and a fingerprint per column.
+    """
+    if np is None:
+        raise ImproperlyConfigured('Similar books need numpy and scipy installed.')
+    rows = UserBookRelation.objects.values_list('user_id', 'book_id', 'is_liked', 'is_bookmarked',
+                                                Coalesce('rate', 0)).iterator(chunk_size=LOAD_CHUNK_SIZE)
+    chunks = [np.array(chunk, dtype=np.int64) for chunk in chunked(rows, LOAD_CHUNK_SIZE)]
+    relations = np.concatenate(chunks) if chunks else np.empty((0, 5), dtype=np.int64)
+    user_ids, users = np.unique(relations[:, 0], return_inverse=True)
+    book_ids, books = np.unique(relations[:, 1], return_inverse=True)
+    liked, bookmarked, rate = relations[:, 2], relations[:, 3], relations[:, 4]
+    weights = liked + 0.5 * bookmarked + np.where(rate > 0, (rate - 3) / 2, 0)
+    matrix = sparse.csc_matrix((weights, (users, books)), shape=(len(user_ids), len(book_ids)))
+    matrix.eliminate_zeros()
+    return matrix, book_ids, fingerprints(relations, books, len(book_ids))
+
+
+def fingerprints(relations, books, count):
+    # Order independent sum of mixed (user, signal) hashes, uint64 arithmetic wraps around on purpose.
+    with np.errstate(over='ignore'):
+        codes = relations[:, 2] + 2 * relations[:, 3] + 4 * relations[:, 4]
+        values = (relations[:, 0].astype(np.uint64) << np.uint64(5)) | codes.astype(np.uint64)
+        values *= np.uint64(0x9E3779B97F4A7C15)
+        values ^= values >> np.uint64(31)
+        values *= np.uint64(0xBF58476D1CE4E5B9)
+        values ^= values >> np.uint64(29)
+        result = np.zeros(count, dtype=np.uint64)
+        np.add.at(result, books, values)
+    return result.view(np.int64)
+
+
+def normalized(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return (matrix @ sparse.diags(inverse)).tocsc()
+
+
+def top_neighbours(similarities, row, column, size):
+    start, end = similarities.indptr[row], similarities.indptr[row + 1]
+    indices, scores = similarities.indices[start:end], similarities.data[start:end]
+    keep = (indices != column) & (scores > 0)
+    indices, scores = indices[keep], scores[keep]
+    # Ties go to the lower column so full and incremental refreshes pick the same neighbours.
+    order = np.lexsort((indices, -scores))[:size]
+    return indices[order], scores[order]
+
+
+def affected_columns(vectors, book_ids, current, size, full):
+    """Columns whose neighbours may have changed since the last refresh, and the ids of books that lost all relations."""
+    stored = dict(SimilarityFingerprint.objects.values_list('book_id', 'fingerprint'))
+    gone = set(stored) - set(book_ids.tolist())
+    if full:
+        return np.arange(len(book_ids)), gone
+    changed = {book_id for book_id, fingerprint in zip(book_ids.tolist(), current.tolist())
+               if stored.get(book_id) != fingerprint} | gone
+    if not changed:
+        return np.empty(0, dtype=np.int64), gone
+    changed_columns = np.flatnonzero(np.isin(book_ids, list(changed)))
+    # Another book's neighbours only change if it listed a changed book or a changed book now beats its last one.
+    listing = {book_id for chunk in chunked(list(changed), 1000)
+               for book_id in SimilarBook.objects.filter(similar_id__in=chunk).values_list('book_id', flat=True)}
+    floors = np.zeros(len(book_ids))
+    full_lists = SimilarBook.objects.values('book_id').annotate(floor=Min('score'), count=Count('id')) \
+        .filter(count__gte=size).values_list('book_id', 'floor')
+    for book_id, floor in full_lists:
+        column = np.searchsorted(book_ids, book_id)
+        if column < len(book_ids) and book_ids[column] == book_id:
+            floors[column] = floor
+    best = (vectors.T @ vectors[:, changed_columns]).max(axis=1).toarray().ravel()
+    entering = np.flatnonzero((best > 0) & (best >= floors))
+    listing = np.flatnonzero(np.isin(book_ids, list(listing)))
+    return np.unique(np.concatenate([changed_columns, entering, listing])).astype(np.int64), gone
+
+
+def delete_books(queryset, book_ids):
+    for chunk in chunked(book_ids, 1000):
+        queryset.filter(book_id__in=chunk).delete()
+
+
+def refresh_similar_books(size=20, batch_size=500, full=False):
+    """
+    Recomputes the top size neighbours of books affected by relations changed since the last run,
+    use full after changing size. Returns the number of refreshed books.
+    """
+    matrix, book_ids, current = relation_matrix()
+    vectors = normalized(matrix)
+    columns, gone = affected_columns(vectors, book_ids, current, size, full)
+    rows = vectors.T.tocsr()
+    ids = book_ids.tolist()
+    for batch in chunked(columns.tolist(), batch_size):
+        similarities = (rows[batch] @ vectors).tocsr()
+        similar = []
+        for row, column in enumerate(batch):
+            indices, scores = top_neighbours(similarities, row, column, size)
+            similar += [SimilarBook(book_id=ids[column], similar_id=ids[index], score=score)
+                        for index, score in zip(indices.tolist(), scores.tolist())]
+        with transaction.atomic():
+            SimilarBook.objects.filter(book_id__in=[ids[column] for column in batch]).delete()
+            SimilarBook.objects.bulk_create(similar)
+    refreshed = book_ids[columns].tolist()
+    with transaction.atomic():
+        delete_books(SimilarBook.objects.all(), list(gone))
+        delete_books(SimilarityFingerprint.objects.all(), list(gone) + refreshed)
+        SimilarityFingerprint.objects.bulk_create(
+            SimilarityFingerprint(book_id=book_id, fingerprint=fingerprint)
+            for book_id, fingerprint in zip(refreshed, current[columns].tolist())
+        )
+    return len(refreshed)
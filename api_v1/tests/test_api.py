@@ -1,7 +1,9 @@
 import json
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.db.models import Count, Case, When, Avg, ExpressionWrapper, F, DecimalField, Subquery, OuterRef
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.exceptions import ErrorDetail
@@ -36,6 +38,14 @@ class BookApiTestCase(APITestCase):
         self.assertEqual(serializer_data[0]['rating'], '5.00')
         self.assertEqual(serializer_data[0]['likes_count'], 1)
 
+    def test_get_list_of_books_reads_precomputed_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_list)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data['results'][0]['likes_count'])
+        self.assertEqual('testuser', response.data['results'][0]['owner_name'])
+        self.assertFalse([query['sql'] for query in queries if 'GROUP BY' in query['sql']])
+
     def test_get_list_of_filtered_books_by_price(self):
         response = self.client.get(self.url_list, data={'price': 100})
         books = Book.objects.filter(id__in=[self.book1.id, self.book3.id]).annotate(
@@ -199,6 +209,18 @@ class UserBookRelationApiTestCase(APITestCase):
         relation = UserBookRelation.objects.get(user=self.user, book=self.book1)
         self.assertTrue(relation.is_liked)
 
+    def test_update_locks_book_then_relation(self):
+        UserBookRelation.objects.create(user=self.user, book=self.book1, is_liked=True)
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, data={'is_liked': False}, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        sql = [query['sql'] for query in queries]
+        self.assertFalse([query for query in sql if query.startswith('INSERT')])
+        book = next(index for index, query in enumerate(sql) if query.startswith('SELECT "store_book"'))
+        relation = next(index for index, query in enumerate(sql) if query.startswith('SELECT "store_userbookrelation"'))
+        self.assertLess(book, relation)
+
     def test_unlike(self):
         relation = UserBookRelation.objects.create(user=self.user, book=self.book1, is_liked=True)
         data = {
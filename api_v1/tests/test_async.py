@@ -0,0 +1,82 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from api_v1.cache import get_cache
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class AsyncBookViewsTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(username='testuser')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1', owner=self.user)
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2')
+        UserBookRelation.objects.create(user=self.user, book=self.book1, rate=5, is_liked=True)
+        UserBookRelation.objects.create(user=self.user, book=self.book2, rate=3)
+
+    async def test_list_matches_sync_list(self):
+        expected = await self.async_client.get(reverse('api_v1:book-list'), {'ordering': '-price'})
+        response = await self.async_client.get(reverse('api_v1:async-book-list'), {'ordering': '-price'})
+        cached = await self.async_client.get(reverse('api_v1:async-book-list'), {'ordering': '-price'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(expected.json()['results'], response.json()['results'])
+        self.assertEqual(response.json(), cached.json())
+        self.assertEqual(response['ETag'], cached['ETag'])
+
+    async def test_detail_not_modified(self):
+        url = reverse('api_v1:async-book-detail', args=(self.book1.id,))
+        response = await self.async_client.get(url)
+        self.assertEqual('Test Book 1', response.json()['name'])
+        not_modified = await self.async_client.get(url, **{'If-None-Match': response['ETag']})
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, not_modified.status_code)
+
+    async def test_detail_not_found(self):
+        response = await self.async_client.get(reverse('api_v1:async-book-detail', args=(0,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.post(reverse('api_v1:async-book-list'))
+        self.assertEqual(status.HTTP_405_METHOD_NOT_ALLOWED, response.status_code)
+
+
+class AsyncRelationViewsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.other = User.objects.create(username='other')
+        self.books = [Book.objects.create(name=f'Book {i}', price=100, author_name='Author') for i in range(3)]
+        for book in self.books:
+            UserBookRelation.objects.create(user=self.user, book=book, rate=4)
+        UserBookRelation.objects.create(user=self.other, book=self.books[0], rate=1)
+
+    def login(self, user):
+        self.client.force_login(user)
+        self.async_client.cookies = self.client.cookies
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse('api_v1:async-userbookrelation-list'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+    async def test_list_pages(self):
+        await sync_to_async(self.login)(self.user)
+        response = await self.async_client.get(reverse('api_v1:async-userbookrelation-list'), {'page_size': 2})
+        data = response.json()
+        self.assertEqual([self.books[0].id, self.books[1].id], [item['book'] for item in data['results']])
+        self.assertEqual(4, data['results'][0]['rate'])
+        self.assertIsNotNone(data['next'])
+        response = await self.async_client.get(data['next'])
+        self.assertEqual([self.books[2].id], [item['book'] for item in response.json()['results']])
+        self.assertIsNone(response.json()['next'])
+
+    async def test_retrieve(self):
+        await sync_to_async(self.login)(self.other)
+        url = reverse('api_v1:async-userbookrelation-detail', args=(self.books[0].id,))
+        self.assertEqual(1, json.loads((await self.async_client.get(url)).content)['rate'])
+        url = reverse('api_v1:async-userbookrelation-detail', args=(self.books[1].id,))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, (await self.async_client.get(url)).status_code)
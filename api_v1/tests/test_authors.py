@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from api_v1.logic import link_authors
+from store.models import Author, Book, UserBookRelation
+
+User = get_user_model()
+
+
+class AuthorTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user1 = User.objects.create(username='user1')
+        self.user2 = User.objects.create(username='user2')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Leo Tolstoy')
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='leo  tolstoy')
+        self.book3 = Book.objects.create(name='Test Book 3', price=300, author_name='Anton Chekhov')
+        self.tolstoy = Author.objects.get(key='leo tolstoy')
+
+    def assertAuthor(self, author, books_count, rating, likes_total):
+        author.refresh_from_db()
+        self.assertEqual(books_count, author.books_count)
+        self.assertEqual(rating, None if author.rating is None else str(author.rating))
+        self.assertEqual(likes_total, author.likes_total)
+
+    def test_spellings_share_an_author(self):
+        self.assertEqual(self.tolstoy.pk, self.book2.author_id)
+        self.assertEqual('Leo Tolstoy', self.tolstoy.name)
+        self.assertEqual(2, Author.objects.count())
+        self.assertAuthor(self.tolstoy, 2, None, 0)
+
+    def test_relations_update_counters(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book1, is_liked=True, rate=5)
+        UserBookRelation.objects.create(user=self.user2, book=self.book2, is_liked=True, rate=2)
+        self.assertAuthor(self.tolstoy, 2, '3.50', 2)
+        relation.delete()
+        self.assertAuthor(self.tolstoy, 2, '2.00', 1)
+
+    def test_renaming_and_deleting_books_update_counters(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book2, is_liked=True, rate=4)
+        self.book2.refresh_from_db()
+        self.book2.author_name = 'Anton Chekhov'
+        self.book2.save()
+        self.assertAuthor(self.tolstoy, 1, None, 0)
+        self.assertAuthor(self.book3.author, 2, '4.00', 1)
+        self.book2.delete()
+        self.assertAuthor(self.book3.author, 1, None, 0)
+
+    def test_link_authors(self):
+        Book.objects.bulk_create([Book(name='Test Book 4', price=1, author_name='LEO TOLSTOY'),
+                                  Book(name='Test Book 5', price=1, author_name='Fyodor Dostoevsky')])
+        self.assertEqual(2, link_authors(Book.objects.filter(author=None)))
+        self.assertAuthor(self.tolstoy, 3, None, 0)
+        self.assertEqual(['Anton Chekhov', 'Fyodor Dostoevsky', 'Leo Tolstoy'],
+                         sorted(Author.objects.values_list('name', flat=True)))
+
+    def test_endpoints(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book3, is_liked=True, rate=5)
+        response = self.client.get(reverse('api_v1:author-list'), data={'ordering': '-likes_total'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual({'id': self.book3.author_id, 'name': 'Anton Chekhov', 'books_count': 1, 'rating': '5.00',
+                          'likes_count': 1}, response.data['results'][0])
+        response = self.client.get(reverse('api_v1:author-detail', args=(self.tolstoy.pk,)))
+        self.assertEqual(2, response.data['books_count'])
+        response = self.client.get(reverse('api_v1:author-list'), data={'search': 'tolst'})
+        self.assertEqual([self.tolstoy.pk], [author['id'] for author in response.data['results']])
+
+    def test_authors_without_books_are_not_listed(self):
+        self.book3.delete()
+        response = self.client.get(reverse('api_v1:author-list'))
+        self.assertEqual([self.tolstoy.pk], [author['id'] for author in response.data['results']])
+        response = self.client.get(reverse('api_v1:author-detail', args=(self.book3.author_id,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_books_by_author(self):
+        response = self.client.get(reverse('api_v1:book-list'), data={'author_id': self.tolstoy.pk})
+        self.assertEqual([self.book1.id, self.book2.id], [book['id'] for book in response.data['results']])
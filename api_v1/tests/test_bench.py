@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from store.models import Book
+
+
+class BenchmarkApiTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command('benchmark_api', '--books', '20', '--users', '3', '--relations', '30', *args, stdout=out)
+        return out.getvalue()
+
+    def test_generated_mix(self):
+        self.benchmark('--requests', '50', '--mix', 'list=1,rate=1', '--output', self.path('results.json'))
+        with open(self.path('results.json')) as file:
+            report = json.load(file)
+        self.assertEqual(50, report['requests'])
+        self.assertEqual({'list', 'rate'}, set(report['endpoints']))
+        self.assertEqual(0, sum(stats['errors'] for stats in report['endpoints'].values()))
+        self.assertFalse(Book.objects.exists())
+
+    def test_replay_and_compare(self):
+        with open(self.path('requests.jsonl'), 'w') as file:
+            file.write('{"path": "/api/v1/book/?ordering=-price"}\n\n{"path": "/api/v1/book/", "name": "list"}\n')
+        self.benchmark('--replay', self.path('requests.jsonl'), '--output', self.path('before.json'))
+        output = self.benchmark('--replay', self.path('requests.jsonl'), '--compare', self.path('before.json'))
+        self.assertIn('GET api_v1:book-list ', output)
+        self.assertIn('queries=+0.00', output)
@@ -0,0 +1,152 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class BookBulkApiTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.user2 = User.objects.create(username='testuser2')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1', owner=self.user)
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2', owner=self.user2)
+        self.url = reverse('api_v1:book-bulk')
+
+    def post(self, data, content_type='application/json'):
+        return self.client.post(self.url, data=data, content_type=content_type)
+
+    def test_create_and_update(self):
+        self.client.force_login(self.user)
+        data = [
+            {'name': 'New Book 1', 'price': 10, 'author_name': 'New Author'},
+            {'id': self.book1.id, 'name': 'Renamed Book 1', 'price': 150, 'author_name': 'Author 1'},
+            {'name': 'New Book 2', 'price': 20, 'author_name': 'New Author'},
+        ]
+        response = self.post(json.dumps(data))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((2, 1, 0), (response.data['created'], response.data['updated'], response.data['failed']))
+        self.assertEqual(['created', 'updated', 'created'], [result['status'] for result in response.data['results']])
+        self.assertEqual(4, Book.objects.count())
+        self.assertEqual(2, Book.objects.filter(author_name='New Author', owner=self.user).count())
+        self.book1.refresh_from_db()
+        self.assertEqual('Renamed Book 1', self.book1.name)
+        self.assertEqual(150, self.book1.price)
+
+    def test_per_item_errors(self):
+        self.client.force_login(self.user)
+        data = [
+            {'name': 'New Book 1', 'price': 'free', 'author_name': 'New Author'},
+            {'id': self.book2.id, 'name': 'Not Mine', 'price': 1, 'author_name': 'Author 2'},
+            {'id': 999, 'name': 'Missing', 'price': 1, 'author_name': 'Author'},
+            {'name': 'New Book 2', 'price': 20, 'author_name': 'New Author'},
+        ]
+        response = self.post(json.dumps(data))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        results = response.data['results']
+        self.assertEqual(['error', 'error', 'error', 'created'], [result['status'] for result in results])
+        self.assertIn('price', results[0]['errors'])
+        self.assertEqual(['Not found.'], results[2]['errors']['id'])
+        self.book2.refresh_from_db()
+        self.assertEqual('Test Book 2', self.book2.name)
+        self.assertEqual(3, Book.objects.count())
+
+    def test_staff_updates_any_book(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        data = [{'id': self.book2.id, 'name': 'Staff Edit', 'price': 1, 'author_name': 'Author 2'}]
+        response = self.post(json.dumps(data))
+        self.assertEqual(1, response.data['updated'])
+
+    def test_ndjson(self):
+        self.client.force_login(self.user)
+        lines = '\n'.join(json.dumps({'name': f'Stream {i}', 'price': i, 'author_name': 'Streamer'}) for i in range(5))
+        response = self.post(lines + '\n', content_type='application/x-ndjson')
+        self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+        self.assertEqual(5, response.data['created'])
+        self.assertEqual(5, Book.objects.filter(author_name='Streamer').count())
+
+    def test_created_books_are_searchable(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('api_v1:book-list'), data={'search': 'zebra'})
+        self.post(json.dumps([{'name': 'Zebra Stripes', 'price': 5, 'author_name': 'Someone'}]))
+        response = self.client.get(reverse('api_v1:book-list'), data={'search': 'zebra'})
+        self.assertEqual(['Zebra Stripes'], [book['name'] for book in response.data['results']])
+
+    def test_not_a_list(self):
+        self.client.force_login(self.user)
+        response = self.post(json.dumps({'name': 'Single'}))
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_anonymous(self):
+        response = self.post(json.dumps([]))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+
+
+class UserBookRelationBulkApiTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.user2 = User.objects.create(username='testuser2')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2')
+        self.book3 = Book.objects.create(name='Test Book 3', price=300, author_name='Author 3')
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, rate=2)
+        self.url = reverse('api_v1:userbookrelation-bulk')
+
+    def post(self, data):
+        return self.client.post(self.url, data=json.dumps(data), content_type='application/json')
+
+    def test_upsert(self):
+        UserBookRelation.objects.create(user=self.user, book=self.book2, is_bookmarked=True, rate=1)
+        self.client.force_login(self.user)
+        data = [
+            {'book': self.book1.id, 'is_liked': True, 'rate': 5},
+            {'book': self.book2.id, 'rate': 3},
+            {'book': self.book3.id, 'is_bookmarked': True},
+        ]
+        response = self.post(data)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((2, 1, 0), (response.data['created'], response.data['updated'], response.data['failed']))
+
+        relation = UserBookRelation.objects.get(user=self.user, book=self.book2)
+        self.assertEqual((3, True), (relation.rate, relation.is_bookmarked))
+        self.assertEqual(3, UserBookRelation.objects.filter(user=self.user).count())
+
+        self.book1.refresh_from_db()
+        self.assertEqual(('3.50', 7, 2, 1), (str(self.book1.rating), self.book1.rating_sum,
+                                             self.book1.rating_count, self.book1.likes_total))
+        self.book2.refresh_from_db()
+        self.assertEqual('3.00', str(self.book2.rating))
+
+    def test_recomputes_each_book_once(self):
+        self.client.force_login(self.user)
+        data = [{'book': book.id, 'rate': 4} for book in (self.book1, self.book2, self.book3)]
+        with CaptureQueriesContext(connection) as queries:
+            self.post(data)
+        self.assertEqual(2, len([query for query in queries if query['sql'].startswith('UPDATE "store_book"')]))
+
+    def test_last_entry_for_a_book_wins(self):
+        self.client.force_login(self.user)
+        response = self.post([{'book': self.book3.id, 'rate': 1}, {'book': self.book3.id, 'rate': 5}])
+        self.assertEqual(['created', 'created'], [result['status'] for result in response.data['results']])
+        self.assertEqual(5, UserBookRelation.objects.get(user=self.user, book=self.book3).rate)
+
+    def test_per_item_errors(self):
+        self.client.force_login(self.user)
+        response = self.post([{'book': 999, 'rate': 4}, {'book': self.book1.id, 'rate': 7}, {'rate': 1},
+                              {'book': self.book2.id, 'is_liked': True}])
+        self.assertEqual(['error', 'error', 'error', 'created'],
+                         [result['status'] for result in response.data['results']])
+        self.assertFalse(UserBookRelation.objects.filter(user=self.user, book=self.book1).exists())
+
+    def test_anonymous(self):
+        response = self.post([])
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
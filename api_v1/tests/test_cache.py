@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class BookResponseCacheTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(username='testuser')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1', owner=self.user)
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2')
+        self.url_list = reverse('api_v1:book-list')
+        self.url_detail = reverse('api_v1:book-detail', args=(self.book1.id,))
+
+    def test_list_is_served_from_cache(self):
+        response = self.client.get(self.url_list, data={'ordering': 'price', 'page': 1})
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url_list, data={'page': 1, 'ordering': 'price'})
+        self.assertEqual(response.data, cached.data)
+        self.assertEqual(response['ETag'], cached['ETag'])
+
+    def test_different_queries_are_cached_separately(self):
+        response = self.client.get(self.url_list, data={'ordering': 'price'})
+        other = self.client.get(self.url_list, data={'ordering': '-price'})
+        self.assertNotEqual(response['ETag'], other['ETag'])
+        self.assertEqual(self.book2.id, other.data['results'][0]['id'])
+
+    def test_not_modified(self):
+        response = self.client.get(self.url_detail)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url_detail, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, not_modified.status_code)
+        self.assertEqual(response['ETag'], not_modified['ETag'])
+
+    def test_relation_change_invalidates_list_and_book(self):
+        list_response = self.client.get(self.url_list)
+        detail_response = self.client.get(self.url_detail)
+        UserBookRelation.objects.create(user=self.user, book=self.book1, is_liked=True, rate=4)
+
+        response = self.client.get(self.url_list, HTTP_IF_NONE_MATCH=list_response['ETag'])
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data['results'][0]['likes_count'])
+        response = self.client.get(self.url_detail, HTTP_IF_NONE_MATCH=detail_response['ETag'])
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('4.00', response.data['rating'])
+
+    def test_book_change_invalidates_only_that_book(self):
+        detail_response = self.client.get(self.url_detail)
+        self.book2.price = 300
+        self.book2.save()
+        response = self.client.get(self.url_detail, HTTP_IF_NONE_MATCH=detail_response['ETag'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+    def test_owner_rename_invalidates_books(self):
+        self.client.get(self.url_detail)
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get(self.url_detail)
+        self.assertEqual('renamed', response.data['owner_name'])
+
+    def test_login_does_not_invalidate_books(self):
+        response = self.client.get(self.url_detail)
+        self.client.force_login(self.user)
+        cached = self.client.get(self.url_detail, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, cached.status_code)
+
+    def test_missing_book_is_not_cached(self):
+        url = reverse('api_v1:book-detail', args=(self.book2.id + 1,))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get(url).status_code)
+        self.assertNotIn('ETag', self.client.get(url))
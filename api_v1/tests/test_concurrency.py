@@ -0,0 +1,83 @@
+import random
+import threading
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.models import Avg
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api_v1.logic import find_counter_drift
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row locks and concurrent connections')
+# Lock waits are the point here, with BOOKS_QUERY_DETECTOR_RAISE=1 the detector fails them as slow queries.
+@override_settings(BOOKS_QUERY_DETECTOR_RAISE=False)
+class ConcurrentRelationUpdateTestCase(TransactionTestCase):
+    threads = 8
+    updates = 15
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'testuser{i}') for i in range(self.threads)]
+        self.book = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+        self.url = reverse('api_v1:userbookrelation-detail', args=(self.book.id,))
+
+    def run_threads(self, users, bulk=False):
+        barrier = threading.Barrier(len(users))
+        errors = []
+
+        def worker(user, seed):
+            rnd = random.Random(seed)
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                for _ in range(self.updates):
+                    data = {'rate': rnd.randint(1, 5), 'is_liked': rnd.random() < 0.5}
+                    if bulk and seed % 2:
+                        response = client.post(reverse('api_v1:userbookrelation-bulk'),
+                                               data=[{'book': self.book.id, **data}], format='json')
+                    else:
+                        response = client.patch(self.url, data=data, format='json')
+                    if response.status_code != status.HTTP_200_OK:
+                        errors.append(response.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(user, seed)) for seed, user in enumerate(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+
+    def assertConsistent(self):
+        self.book.refresh_from_db()
+        relations = UserBookRelation.objects.filter(book=self.book)
+        self.assertEqual(relations.count(), relations.values('user').distinct().count())
+        self.assertFalse(find_counter_drift().exists())
+        self.assertAlmostEqual(relations.aggregate(rating=Avg('rate'))['rating'], float(self.book.rating), places=2)
+
+    def test_many_readers_rate_one_book(self):
+        self.run_threads(self.users)
+        self.assertEqual(self.threads, UserBookRelation.objects.filter(book=self.book).count())
+        self.assertConsistent()
+
+    def test_one_reader_rates_from_many_clients(self):
+        self.run_threads([self.users[0]] * self.threads)
+        self.assertEqual(1, UserBookRelation.objects.filter(book=self.book).count())
+        self.assertConsistent()
+
+    def test_one_reader_updates_and_bulk_upserts(self):
+        # Single updates and bulk upserts lock the book before the relation, so they cannot deadlock.
+        self.run_threads([self.users[0]] * self.threads, bulk=True)
+        self.assertEqual(1, UserBookRelation.objects.filter(book=self.book).count())
+        self.assertConsistent()
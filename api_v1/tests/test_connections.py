@@ -0,0 +1,59 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.backends.sqlite3 import base
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from books.db.connections import ConnectionReuseMixin, stats
+
+User = get_user_model()
+
+
+class DatabaseWrapper(ConnectionReuseMixin, base.DatabaseWrapper):
+    pass
+
+
+class ConnectionReuseTestCase(SimpleTestCase):
+    def setUp(self):
+        stats.reset()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # In-memory SQLite connections are never closed, so use a file to let the health check replace one.
+        self.connection = DatabaseWrapper({
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': f'{directory.name}/db.sqlite3', 'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True, 'OPTIONS': {}, 'TIME_ZONE': None, 'AUTOCOMMIT': True,
+        }, alias='pooled')
+        self.addCleanup(self.connection.close)
+
+    def request(self):
+        self.connection.close_if_unusable_or_obsolete()
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.execute('SELECT 2')
+
+    def test_connection_is_reused_between_requests(self):
+        self.request()
+        self.request()
+        self.request()
+        counts = stats.snapshot()['pooled']
+        self.assertEqual((2, 1, 0), (counts['hits'], counts['misses'], counts['health_check_failures']))
+        self.assertGreaterEqual(counts['wait_seconds_max'], 0)
+
+    def test_unusable_connection_is_replaced(self):
+        self.request()
+        with mock.patch.object(DatabaseWrapper, 'is_usable', return_value=False):
+            self.request()
+        counts = stats.snapshot()['pooled']
+        self.assertEqual((0, 2, 1), (counts['hits'], counts['misses'], counts['health_check_failures']))
+
+
+class ConnectionStatsViewTestCase(TestCase):
+    def test_staff_only(self):
+        url = reverse('api_v1:connections')
+        self.client.force_login(User.objects.create(username='testuser'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(url).status_code)
+        self.client.force_login(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(status.HTTP_200_OK, self.client.get(url).status_code)
@@ -0,0 +1,61 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class BookExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1', owner=self.user,
+                                         discount=10)
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2')
+        UserBookRelation.objects.create(user=self.user, book=self.book1, is_liked=True, rate=5)
+        self.url = reverse('api_v1:book-export')
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('application/x-ndjson', response['Content-Type'])
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual({
+            'id': self.book1.id,
+            'name': 'Test Book 1',
+            'price': '100.00',
+            'author_name': 'Author 1',
+            'likes_count': 1,
+            'rating': '5.00',
+            'discounted_price': '90.00',
+            'owner_name': 'testuser',
+        }, rows[0])
+        self.assertEqual(2, len(rows))
+
+    def test_csv_respects_filters(self):
+        response = self.client.get(self.url, data={'export_format': 'csv', 'price': 200})
+        self.assertEqual('text/csv', response['Content-Type'])
+        rows = list(csv.reader(StringIO(self.read(response))))
+        self.assertEqual(['id', 'name', 'price', 'author_name', 'likes_count', 'rating', 'discounted_price',
+                          'owner_name'], rows[0])
+        self.assertEqual([[str(self.book2.id), 'Test Book 2', '200.00', 'Author 2', '0', '', '200.00', '']],
+                         rows[1:])
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, data={'export_format': 'xml'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_books', '--format', 'csv', '--chunk-size', '1', stdout=out)
+        self.assertEqual(3, len(out.getvalue().splitlines()))
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.serializers import BookListSerializer
+from api_v1.views import book_queryset
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class BookSparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='testuser', first_name='Test')
+        self.user2 = User.objects.create(username='testuser2')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1', owner=self.user,
+                                         discount=10)
+        self.book2 = Book.objects.create(name='Test Book 2', price='200.50', author_name='Author 2')
+        UserBookRelation.objects.create(user=self.user, book=self.book1, is_liked=True, rate=5)
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, rate=2)
+        self.url_list = reverse('api_v1:book-list')
+        self.url_detail = reverse('api_v1:book-detail', args=(self.book1.id,))
+
+    def test_fast_path_matches_list_serializer(self):
+        response = self.client.get(self.url_list, data={'page_size': 10})
+        expected = BookListSerializer(book_queryset(readers=False), many=True).data
+        self.assertEqual(expected, response.data['results'])
+        self.assertEqual('3.50', response.data['results'][0]['rating'])
+        self.assertEqual('90.00', response.data['results'][0]['discounted_price'])
+
+    def test_sparse_list_prunes_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_list, data={'fields': 'name,id,price', 'page_size': 10})
+        self.assertEqual([{'id': self.book1.id, 'name': 'Test Book 1', 'price': '100.00'},
+                          {'id': self.book2.id, 'name': 'Test Book 2', 'price': '200.50'}],
+                         response.data['results'])
+        self.assertEqual(2, len(queries))
+        self.assertFalse([query['sql'] for query in queries if 'auth_user' in query['sql']])
+
+    def test_sparse_list_with_readers_count(self):
+        response = self.client.get(self.url_list, data={'fields': 'id,readers_count', 'pagination': 'cursor',
+                                                        'ordering': '-price'})
+        self.assertEqual([{'id': self.book2.id, 'readers_count': 0}, {'id': self.book1.id, 'readers_count': 2}],
+                         response.data['results'])
+
+    def test_sparse_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_detail, data={'fields': 'id,rating'})
+        self.assertEqual({'id': self.book1.id, 'rating': '3.50'}, response.data)
+        self.assertEqual(1, len(queries))
+
+    def test_unknown_field(self):
+        response = self.client.get(self.url_list, data={'fields': 'id,password'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
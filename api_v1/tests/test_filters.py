@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from api_v1.filters import AUTHOR_FACETS
+from store.models import Book, User, UserBookRelation
+
+
+class BookFilterTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.books = [
+            Book.objects.create(name='Test Book 1', price=5, author_name='Author 1'),
+            Book.objects.create(name='Test Book 2', price=15, author_name='Author 1', discount=10),
+            Book.objects.create(name='Test Book 3', price=60, author_name='Author 2', discount=5),
+            Book.objects.create(name='Test Book 4', price=1500, author_name='Author 3'),
+        ]
+        users = [User.objects.create(username=f'user{i}') for i in range(2)]
+        UserBookRelation.objects.create(user=users[0], book=self.books[0], rate=5)
+        UserBookRelation.objects.create(user=users[0], book=self.books[1], rate=4)
+        UserBookRelation.objects.create(user=users[1], book=self.books[1], rate=3)
+        UserBookRelation.objects.create(user=users[0], book=self.books[2], rate=1)
+
+    def ids(self, **params):
+        response = self.client.get(reverse('api_v1:book-list'), data={**params, 'page_size': 100})
+        self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+        return [book['id'] for book in response.data['results']]
+
+    def expected(self, *indexes):
+        return [self.books[index].id for index in indexes]
+
+    def test_filters(self):
+        self.assertEqual(self.expected(1), self.ids(price=15))
+        self.assertEqual(self.expected(1, 2), self.ids(price_min=10, price_max=60))
+        self.assertEqual(self.expected(0, 1), self.ids(discounted_price_max=5))
+        self.assertEqual(self.expected(2, 3), self.ids(discounted_price_min=50))
+        self.assertEqual(self.expected(0, 1), self.ids(rating_min=3.5))
+        self.assertEqual(self.expected(0, 1, 3), self.ids(author='Author 1,Author 3'))
+        self.assertEqual(self.expected(1), self.ids(author='Author 1', price_min=10, search='Book'))
+
+    def test_invalid_filter(self):
+        response = self.client.get(reverse('api_v1:book-list'), data={'price_min': 'cheap'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_facets(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_v1:book-list'), data={'facets': 1})
+        self.assertEqual(2, len(queries))
+        facets = response.data
+        self.assertEqual(4, facets['count'])
+        self.assertEqual({'min': 0, 'max': 10, 'count': 1}, facets['price'][0])
+        self.assertEqual({'min': 1000, 'max': None, 'count': 1}, facets['price'][-1])
+        self.assertEqual(4, sum(bucket['count'] for bucket in facets['price']))
+        self.assertEqual([1, 0, 1, 0, 1, 1], [bucket['count'] for bucket in facets['rating']])
+        self.assertEqual([{'author_name': 'Author 1', 'count': 2}, {'author_name': 'Author 2', 'count': 1},
+                          {'author_name': 'Author 3', 'count': 1}], facets['authors'])
+
+    def test_facets_of_filtered_books(self):
+        facets = self.client.get(reverse('api_v1:book-list'), data={'facets': 1, 'price_max': 20}).data
+        self.assertEqual(2, facets['count'])
+        self.assertEqual([{'author_name': 'Author 1', 'count': 2}], facets['authors'])
+        facets = self.client.get(reverse('api_v1:book-list'), data={'facets': 1, 'search': 'nothing'}).data
+        self.assertEqual(0, facets['count'])
+
+    def test_facets_are_cached_per_filter_set(self):
+        first = self.client.get(reverse('api_v1:book-list'), data={'facets': 1, 'price_max': 20, 'page': 2})
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('api_v1:book-list'),
+                                     data={'ordering': 'price', 'price_max': 20, 'facets': 'true'})
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertNotIn('results', second.data)
+
+    def test_top_author_facets(self):
+        Book.objects.bulk_create(Book(name=f'Book {i}', price=1, author_name=f'Author {i:02}')
+                                 for i in range(AUTHOR_FACETS + 5))
+        authors = self.client.get(reverse('api_v1:book-list'), data={'facets': 1}).data['authors']
+        self.assertEqual(AUTHOR_FACETS, len(authors))
+        self.assertEqual({'author_name': 'Author 1', 'count': 2}, authors[0])
+        self.assertEqual({'author_name': 'Author 00', 'count': 1}, authors[1])
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class LeaderboardTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = [User.objects.create(username=f'user_{i}') for i in range(3)]
+        self.books = [Book.objects.create(name=f'Test Book {i}', price=100 + i, author_name=f'Author {i}')
+                      for i in range(4)]
+        self.relate(0, 0, is_liked=True, rate=3)
+        self.relate(1, 0, is_liked=True, rate=4)
+        self.relate(0, 1, is_liked=True, is_bookmarked=True, rate=5)
+        self.relate(0, 2, is_bookmarked=True, rate=4)
+        self.relate(1, 2, is_bookmarked=True, rate=3)
+
+    def relate(self, user, book, **fields):
+        return UserBookRelation.objects.create(user=self.users[user], book=self.books[book], **fields)
+
+    def top(self, board, **params):
+        response = self.client.get(reverse('api_v1:book-top', args=(board,)), data=params)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [book['id'] for book in response.data]
+
+    def ids(self, *indexes):
+        return [self.books[index].id for index in indexes]
+
+    def test_boards(self):
+        self.assertEqual(self.ids(0, 1), self.top('most_liked'))
+        self.assertEqual(self.ids(2, 1), self.top('most_bookmarked'))
+        self.assertEqual(self.ids(1, 0, 2), self.top('top_rated'))
+
+    def test_top_rated_is_weighted(self):
+        for user, rate in enumerate((5, 5, 4)):
+            self.relate(user, 3, rate=rate)
+        # (14 + 10 * 3) / 13 tops the single 5 of book 1, (5 + 10 * 3) / 11
+        self.assertEqual(self.ids(3, 1, 0, 2), self.top('top_rated'))
+
+    def test_limit_and_filters(self):
+        self.assertEqual(self.ids(1), self.top('top_rated', limit=1))
+        self.assertEqual(self.ids(0, 2), self.top('top_rated', price=self.books[0].price) +
+                         self.top('top_rated', price=self.books[2].price))
+
+    def test_relation_changes_update_the_board(self):
+        self.assertEqual(self.ids(0, 1), self.top('most_liked'))
+        self.relate(2, 1, is_liked=True)
+        self.relate(2, 3, is_liked=True)
+        self.assertEqual(self.ids(0, 1, 3), self.top('most_liked'))
+        UserBookRelation.objects.filter(user=self.users[1], book=self.books[0]).delete()
+        self.assertEqual(self.ids(1, 0, 3), self.top('most_liked'))
+
+    def test_fields(self):
+        response = self.client.get(reverse('api_v1:book-top', args=('most_bookmarked',)))
+        self.assertEqual({'id': self.books[2].id, 'name': 'Test Book 2', 'author_name': 'Author 2',
+                          'price': '102.00', 'rating': '3.50', 'weighted_rating': '3.08', 'rating_count': 2, 'likes_count': 0,
+                          'bookmarks_count': 2}, response.data[0])
+
+    def test_unknown_board(self):
+        response = self.client.get(reverse('api_v1:book-top', args=('most_read',)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        response = self.client.get(reverse('api_v1:book-top', args=('most_liked',)), data={'limit': 'a'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
@@ -0,0 +1,63 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from api_v1.loader import iter_json_array
+from store.models import Book, User, UserBookRelation
+
+
+class IterJsonArrayTestCase(TestCase):
+    def test_reads_across_chunks(self):
+        items = [{'model': 'store.book', 'pk': i, 'fields': {'name': 'x' * 5000}} for i in range(40)]
+        self.assertEqual(items, list(iter_json_array(StringIO(json.dumps(items)))))
+
+    def test_empty_array(self):
+        self.assertEqual([], list(iter_json_array(StringIO(' [ ] '))))
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('[{"model": "store.book"}, {"mod')))
+
+
+class ImportCatalogCommandTestCase(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def test_fixtures(self):
+        out = StringIO()
+        call_command('import_catalog', str(settings.BASE_DIR / 'fixtures' / 'auth.json'), stdout=out)
+        call_command('import_catalog', str(settings.BASE_DIR / 'fixtures' / 'dump.json'), stdout=out)
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(5, Book.objects.count())
+        self.assertEqual(3, UserBookRelation.objects.count())
+        for book in Book.objects.all():
+            relations = UserBookRelation.objects.filter(book=book)
+            self.assertEqual(relations.filter(is_liked=True).count(), book.likes_total)
+            self.assertEqual(relations.exclude(rate=None).count(), book.rating_count)
+
+    def test_ndjson_and_csv(self):
+        user = User.objects.create(username='owner')
+        books = self.write('books.csv', f'id,name,price,author_name,owner,discount\n'
+                                        f'10,Book A,10.50,Author A,{user.pk},0\n'
+                                        f'11,Book B,20,Author B,,1\n')
+        call_command('import_catalog', books, '--model', 'store.book', stdout=StringIO())
+        relations = self.write('relations.ndjson', '\n'.join(json.dumps(
+            {'model': 'store.userbookrelation', 'fields': {'user': user.pk, 'book': book, 'is_liked': True, 'rate': rate}}
+        ) for book, rate in ((10, 4), (11, 2))))
+        call_command('import_catalog', relations, stdout=StringIO())
+
+        book = Book.objects.get(pk=10)
+        self.assertEqual(('Book A', user, 1, '4.00'), (book.name, book.owner, book.likes_total, str(book.rating)))
+        self.assertIsNone(Book.objects.get(pk=11).owner)
+        self.assertEqual(12, Book.objects.create(name='Next', price=1, author_name='Next').pk)
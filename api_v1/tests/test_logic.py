@@ -1,7 +1,12 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-from api_v1.logic import set_rating
-from store.models import User, Book, UserBookRelation
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api_v1.logic import set_rating, find_counter_drift, rebuild_counters, drain_rating_queue, rating_prior
+from api_v1.utils import chunked
+from store.models import User, Book, UserBookRelation, QueuedBookRating
 
 
 class SetRatingTestCase(TestCase):
@@ -20,3 +25,129 @@ class SetRatingTestCase(TestCase):
         set_rating(self.book1)
         self.book1.refresh_from_db()
         self.assertEqual('4.67', str(self.book1.rating))
+
+
+class BookCountersTestCase(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create(username='user1')
+        self.user2 = User.objects.create(username='user2')
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+
+    def assertCounters(self, rating, rating_sum, rating_count, likes_total):
+        self.book1.refresh_from_db()
+        self.assertEqual(rating, None if self.book1.rating is None else str(self.book1.rating))
+        self.assertEqual(rating_sum, self.book1.rating_sum)
+        self.assertEqual(rating_count, self.book1.rating_count)
+        self.assertEqual(likes_total, self.book1.likes_total)
+
+    def test_create(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book1, is_liked=True, rate=5)
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, rate=4)
+        self.assertCounters('4.50', 9, 2, 1)
+
+    def test_update(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book1, rate=5)
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, is_liked=True, rate=2)
+        relation.rate = 3
+        relation.is_liked = True
+        relation.save()
+        self.assertCounters('2.50', 5, 2, 2)
+        relation.rate = None
+        relation.save()
+        self.assertCounters('2.00', 2, 1, 2)
+
+    def test_delete(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book1, is_liked=True, rate=5)
+        relation.delete()
+        self.assertCounters(None, 0, 0, 0)
+
+    def test_delete_user_cascades(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book1, is_liked=True, rate=5)
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, rate=1)
+        self.user1.delete()
+        self.assertCounters('1.00', 1, 1, 0)
+
+    def test_bookmarks(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book1, is_bookmarked=True)
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, is_bookmarked=True)
+        relation.is_bookmarked = False
+        relation.save()
+        self.book1.refresh_from_db()
+        self.assertEqual(1, self.book1.bookmarks_total)
+        Book.objects.filter(pk=self.book1.pk).update(bookmarks_total=5)
+        self.assertEqual([self.book1.pk], [book.pk for book in find_counter_drift()])
+        UserBookRelation.objects.filter(user=self.user2).delete()
+        rebuild_counters()
+        self.book1.refresh_from_db()
+        self.assertEqual(0, self.book1.bookmarks_total)
+
+    def test_rebuild_fixes_drift(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book1, is_liked=True, rate=5)
+        Book.objects.filter(pk=self.book1.pk).update(rating_sum=0, rating_count=7, likes_total=3)
+        self.assertEqual([self.book1.pk], [book.pk for book in find_counter_drift()])
+        rebuild_counters()
+        self.assertFalse(find_counter_drift().exists())
+        self.assertCounters('5.00', 5, 1, 1)
+
+    def test_rebuild_command_check(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book1, rate=4)
+        Book.objects.filter(pk=self.book1.pk).update(rating_sum=0)
+        out = StringIO()
+        call_command('rebuild_book_counters', '--check', stdout=out)
+        self.assertIn('1 book(s) with drifted counters', out.getvalue())
+        self.assertCounters('4.00', 0, 1, 0)
+        call_command('rebuild_book_counters', stdout=StringIO())
+        self.assertCounters('4.00', 4, 1, 0)
+
+
+@override_settings(BOOKS_RATING_DEFERRED=True)
+class DeferredRatingTestCase(TestCase):
+    setUp = BookCountersTestCase.setUp
+    assertCounters = BookCountersTestCase.assertCounters
+
+    def test_changes_are_queued_once_per_book(self):
+        relation = UserBookRelation.objects.create(user=self.user1, book=self.book1, is_liked=True, rate=5)
+        UserBookRelation.objects.create(user=self.user2, book=self.book1, rate=4)
+        relation.rate = 3
+        relation.save()
+        self.assertCounters(None, 0, 0, 0)
+        self.assertEqual([self.book1.pk], list(QueuedBookRating.objects.values_list('book_id', flat=True)))
+
+        self.assertEqual([self.book1.pk], drain_rating_queue())
+        self.assertCounters('3.50', 7, 2, 1)
+        self.assertFalse(QueuedBookRating.objects.exists())
+        self.assertEqual([], drain_rating_queue())
+
+    def test_queued_again_while_draining(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book1, rate=5)
+
+        def rate_then_chunk(rows, size):
+            # Written after the drain read the queue and before it deletes the rows it read.
+            UserBookRelation.objects.create(user=self.user2, book=self.book1, rate=1)
+            return chunked(rows, size)
+
+        with mock.patch('api_v1.logic.chunked', rate_then_chunk):
+            self.assertEqual([self.book1.pk], drain_rating_queue())
+        self.assertEqual([self.book1.pk], list(QueuedBookRating.objects.values_list('book_id', flat=True)))
+        self.assertEqual([self.book1.pk], drain_rating_queue())
+        self.assertCounters('3.00', 6, 2, 0)
+
+    def test_batches(self):
+        books = [Book.objects.create(name=f'Book {i}', price=1, author_name='Author') for i in range(5)]
+        for book in books:
+            UserBookRelation.objects.create(user=self.user1, book=book, rate=2)
+        # Savepoint, queued ids, delete, two book and two author counter updates, release. The catalog mean
+        # of the weighted rating is read from the cache.
+        rating_prior()
+        with self.assertNumQueries(8):
+            self.assertEqual(2, len(drain_rating_queue(batch_size=2)))
+        out = StringIO()
+        call_command('drain_rating_queue', stdout=out)
+        self.assertIn('Recomputed 3 book(s)', out.getvalue())
+        self.assertEqual({2}, {book.rating_sum for book in Book.objects.filter(pk__in=[book.pk for book in books])})
+
+    def test_deleted_book(self):
+        UserBookRelation.objects.create(user=self.user1, book=self.book1, rate=2)
+        pk = self.book1.pk
+        self.book1.delete()
+        self.assertEqual([pk], drain_rating_queue())
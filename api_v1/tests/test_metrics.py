@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from store.models import Book
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.book = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+
+    def timings(self, response):
+        return {part.split(';')[0].strip(): part for part in response['Server-Timing'].split(',')}
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('api_v1:book-list'))
+        timings = self.timings(response)
+        self.assertEqual({'db', 'serializer', 'total'}, set(timings))
+        self.assertIn('desc="3 queries"', timings['db'])
+        cached = self.client.get(reverse('api_v1:book-list'))
+        self.assertIn('desc="0 queries"', self.timings(cached)['db'])
+
+    async def test_async_view(self):
+        response = await self.async_client.get(reverse('api_v1:async-book-list'))
+        self.assertIn('desc="3 queries"', self.timings(response)['db'])
+
+    def test_only_api_views_are_recorded(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metrics(self):
+        self.client.get(reverse('api_v1:book-detail', args=(self.book.id,)))
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        body = response.content.decode()
+        self.assertIn('# TYPE books_request_duration_seconds histogram', body)
+        self.assertIn('books_request_duration_seconds_bucket{view="api_v1:book-detail",method="GET",status="200",'
+                      'le="+Inf"}', body)
+        self.assertIn('books_request_db_queries_count{view="api_v1:book-detail",method="GET"}', body)
+        self.assertIn('books_response_size_bytes_sum{view="api_v1:book-detail",method="GET"}', body)
+
+    def test_staff_only_without_token(self):
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(reverse('metrics')).status_code)
+        self.client.force_login(User.objects.create(username='user'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(reverse('metrics')).status_code)
+
+    @override_settings(BOOKS_METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(reverse('metrics')).status_code)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book
+
+User = get_user_model()
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        prices = [300, 100, 200, 100, 300, 100, 250]
+        self.books = [
+            Book.objects.create(name=f'Test Book {i}', price=price, author_name=f'Author {i % 3}')
+            for i, price in enumerate(prices)
+        ]
+        self.url_list = reverse('api_v1:book-list')
+
+    def walk(self, url, data, link='next'):
+        ids = []
+        while url:
+            response = self.client.get(url, data=data)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            ids += [book['id'] for book in response.data['results']]
+            url, data = response.data[link], None
+        return ids, response
+
+    def test_walk_forward_by_price(self):
+        ids, _ = self.walk(self.url_list, {'pagination': 'cursor', 'ordering': 'price', 'page_size': 2})
+        expected = [book.id for book in sorted(self.books, key=lambda book: (book.price, book.id))]
+        self.assertEqual(expected, ids)
+
+    def test_walk_forward_by_author_name_descending(self):
+        ids, _ = self.walk(self.url_list, {'pagination': 'cursor', 'ordering': '-author_name', 'page_size': 3})
+        expected = [book.id for book in sorted(self.books, key=lambda book: (book.author_name, book.id))][::-1]
+        self.assertEqual(expected, ids)
+
+    def test_walk_back(self):
+        data = {'pagination': 'cursor', 'ordering': 'price', 'page_size': 3}
+        ids, response = self.walk(self.url_list, data)
+        self.assertIsNone(response.data['next'])
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(ids[3:6], [book['id'] for book in previous.data['results']])
+        self.assertIsNotNone(previous.data['next'])
+
+    def test_no_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_list, data={'pagination': 'cursor'})
+        self.assertNotIn('count', response.data)
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(*)' in query['sql']])
+
+    def test_page_size_is_capped(self):
+        Book.objects.bulk_create(Book(name=f'Bulk {i}', price=1, author_name='Bulk') for i in range(120))
+        response = self.client.get(self.url_list, data={'pagination': 'cursor', 'page_size': 1000})
+        self.assertEqual(100, len(response.data['results']))
+        response = self.client.get(self.url_list, data={'page_size': 1000})
+        self.assertEqual(100, len(response.data['results']))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url_list, data={'cursor': 'garbage'})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
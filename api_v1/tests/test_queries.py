@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from api_v1.queries import QueryProblems, normalize
+from api_v1.views import RowListMixin
+from store.models import Book
+
+User = get_user_model()
+
+
+def owner_per_book(self, request, *args, **kwargs):
+    return Response([book.owner_id and book.owner.username for book in Book.objects.all()])
+
+
+class NormalizeTestCase(SimpleTestCase):
+    def test_literals_and_in_lists(self):
+        self.assertEqual(normalize('SELECT * FROM "store_book" WHERE "id" IN (%s, %s) LIMIT 21'),
+                         normalize('SELECT * FROM "store_book" WHERE "id" IN (%s, %s, %s) LIMIT 20'))
+        self.assertEqual('SELECT "col1" FROM "t2" WHERE "id" = %s', normalize('SELECT "col1" FROM "t2" WHERE "id" = %s'))
+
+
+@override_settings(BOOKS_QUERY_DETECTOR=True, BOOKS_QUERY_DETECTOR_RAISE=False, BOOKS_QUERY_REPEAT_THRESHOLD=3)
+class QueryDetectorTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(username='test_username')
+        for i in range(3):
+            Book.objects.create(name=f'Test Book {i}', price=100, author_name='Author', owner=self.user)
+
+    def test_repeated_queries_are_logged(self):
+        with mock.patch.object(RowListMixin, 'list', owner_per_book), \
+                self.assertLogs('api_v1.queries', 'WARNING') as logs:
+            self.client.get(reverse('api_v1:book-list'))
+        self.assertEqual(1, len(logs.output))
+        self.assertIn('api_v1:book-list: 3 queries of the same shape from api_v1/tests/test_queries.py', logs.output[0])
+
+    @override_settings(BOOKS_QUERY_DETECTOR_RAISE=True)
+    def test_raise(self):
+        with mock.patch.object(RowListMixin, 'list', owner_per_book), self.assertLogs('api_v1.queries', 'WARNING'), \
+                self.assertRaises(QueryProblems):
+            self.client.get(reverse('api_v1:book-list'))
+
+    @override_settings(BOOKS_QUERY_DETECTOR_RAISE=True)
+    def test_prefetched_views_pass(self):
+        self.client.get(reverse('api_v1:book-list'))
+        self.client.get(reverse('api_v1:book-readers', args=(Book.objects.first().id,)))
+
+    @override_settings(BOOKS_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged(self):
+        with self.assertLogs('api_v1.queries', 'WARNING') as logs:
+            self.client.get(reverse('api_v1:book-detail', args=(Book.objects.first().id,)))
+        self.assertTrue(all('slow query' in line for line in logs.output))
+        self.assertIn('api_v1:book-detail', logs.output[0])
@@ -0,0 +1,159 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from api_v1.logic import rebuild_counters
+from api_v1.search import get_search_backend
+from store.models import Author, Book, UserBookRelation
+
+User = get_user_model()
+
+# (query params, number of queries, index the page query has to use, whether it may sort the matched rows)
+LIST_CASES = [
+    ({}, 3, None, False),
+    ({'price': 7}, 3, 'store_book_price_id_idx', False),
+    ({'ordering': 'price'}, 3, 'store_book_price_id_idx', False),
+    ({'ordering': '-price'}, 3, 'store_book_price_id_idx', False),
+    ({'ordering': 'author_name'}, 3, 'store_book_author_name_id_idx', False),
+    ({'ordering': '-author_name'}, 3, 'store_book_author_name_id_idx', False),
+    ({'price': 7, 'ordering': '-author_name'}, 3, None, True),
+    ({'price_min': 3, 'price_max': 6, 'ordering': 'price'}, 3, 'store_book_price_id_idx', False),
+    ({'author_id': 1}, 3, 'store_book_author_id_idx', False),
+    ({'ordering': '-weighted_rating'}, 3, 'store_book_weighted_rating_idx', False),
+    ({'search': 'Author'}, 3, None, True),
+    ({'pagination': 'cursor'}, 2, None, False),
+    ({'pagination': 'cursor', 'ordering': 'price'}, 2, 'store_book_price_id_idx', False),
+    ({'pagination': 'cursor', 'ordering': '-author_name'}, 2, 'store_book_author_name_id_idx', False),
+    ({'pagination': 'cursor', 'ordering': '-weighted_rating'}, 2, 'store_book_weighted_rating_idx', False),
+    ({'fields': 'id,name,price'}, 2, None, False),
+]
+
+FULL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (store_book|store_userbookrelation)\b'),
+    'sqlite': re.compile(r'^SCAN (store_book|store_userbookrelation)$', re.MULTILINE),
+}
+FULL_SORT = {
+    'postgresql': re.compile(r'(^|->  )Sort\b', re.MULTILINE),
+    'sqlite': re.compile(r'^USE TEMP B-TREE FOR ORDER BY$', re.MULTILINE),
+}
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # The test tables are tiny, without these the planner prefers a seq scan or a bitmap scan and a sort
+            # whatever the indexes are.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(str(row[-1]).strip() for row in cursor.fetchall())
+
+
+class QueryPlanTestCase(APITestCase):
+    """
+    Query counts and EXPLAIN output for every BookViewSet read path. A missing index shows
+    up as a full scan or a full sort of store_book, an N+1 as a query count growing with the page.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(User(username=f'reader{i}', first_name=f'Reader {i}') for i in range(5))
+        # Fixed author ids, the author_id cases filter on the first one.
+        authors = Author.objects.bulk_create(Author(pk=i + 1, name=f'Author {i}', key=f'author {i}') for i in range(7))
+        books = Book.objects.bulk_create(
+            Book(name=f'Book {i}', price=i % 10, author_name=f'Author {i % 7}', author=authors[i % 7],
+                 owner=users[i % 5]) for i in range(40)
+        )
+        UserBookRelation.objects.bulk_create(
+            UserBookRelation(user=user, book=book, rate=3, is_liked=True) for book in books for user in users[:3]
+        )
+        rebuild_counters()
+        # bulk_create skips the search index, the search case would match nothing.
+        get_search_backend().index(Book.objects.all())
+        cls.book = books[0]
+        cls.user = users[0]
+
+    def setUp(self):
+        get_cache().clear()
+        # The SQLite search fallback builds its index on first use, keep that query out of the counts.
+        get_search_backend().search(Book.objects.all(), ['book'])
+
+    def capture(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data=data)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [query['sql'] for query in queries]
+
+    def assertPlan(self, sql, index=None, sorted_ok=False):
+        plan = explain(sql)
+        message = f'{sql}\n{plan}'
+        if index or 'WHERE' in sql:
+            self.assertNotRegex(plan, FULL_SCAN[connection.vendor], message)
+        if not sorted_ok:
+            self.assertNotRegex(plan, FULL_SORT[connection.vendor], message)
+        if index:
+            self.assertIn(index, plan, message)
+
+    def test_list(self):
+        for data, count, index, sorts in LIST_CASES:
+            with self.subTest(**data):
+                get_cache().clear()
+                queries = self.capture(reverse('api_v1:book-list'), {**data, 'page_size': 10})
+                self.assertEqual(count, len(queries), '\n'.join(queries))
+                page = next(sql for sql in queries if 'LIMIT' in sql and 'COUNT(*)' not in sql)
+                self.assertPlan(page, index, sorted_ok=sorts)
+                for sql in queries:
+                    if sql is not page:
+                        self.assertPlan(sql, sorted_ok=True)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        for data, count, _, _ in LIST_CASES:
+            with self.subTest(**data):
+                get_cache().clear()
+                queries = self.capture(reverse('api_v1:book-list'), {**data, 'page_size': 40})
+                self.assertEqual(count, len(queries), '\n'.join(queries))
+
+    def test_retrieve(self):
+        queries = self.capture(reverse('api_v1:book-detail', args=(self.book.id,)))
+        self.assertEqual(2, len(queries), '\n'.join(queries))
+        for sql in queries:
+            self.assertPlan(sql, sorted_ok=True)
+
+    def test_readers(self):
+        queries = self.capture(reverse('api_v1:book-readers', args=(self.book.id,)))
+        self.assertEqual(3, len(queries), '\n'.join(queries))
+        for sql in queries:
+            self.assertPlan(sql, sorted_ok=True)
+
+    def test_leaderboards(self):
+        for board, index in (('most_liked', 'store_book_likes_total_idx'),
+                             ('most_bookmarked', 'store_book_bookmarks_total_idx'),
+                             ('top_rated', 'store_book_weighted_rating_idx')):
+            with self.subTest(board=board):
+                queries = self.capture(reverse('api_v1:book-top', args=(board,)))
+                self.assertEqual(1, len(queries), '\n'.join(queries))
+                self.assertPlan(queries[0], index)
+
+    def test_facets(self):
+        queries = self.capture(reverse('api_v1:book-list'), {'facets': 1, 'price_min': 3})
+        self.assertEqual(2, len(queries), '\n'.join(queries))
+        for query in queries:
+            self.assertPlan(query, sorted_ok=True)
+
+    def test_relation_update(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(reverse('api_v1:userbookrelation-detail', args=(self.book.id,)),
+                                         data={'rate': 5}, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        for query in queries:
+            if 'store_userbookrelation' in query['sql'] and query['sql'].startswith('SELECT'):
+                self.assertPlan(query['sql'], sorted_ok=True)
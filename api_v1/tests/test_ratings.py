@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.cache import get_cache
+from api_v1.logic import RATING_PRIOR_KEY, find_counter_drift, rebuild_ratings
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+class RatingHistogramTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = [User.objects.create(username=f'user{i}') for i in range(4)]
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2')
+
+    def rate(self, book, *rates):
+        return [UserBookRelation.objects.create(user=user, book=book, rate=rate) for user, rate in zip(self.users, rates)]
+
+    def assertRatings(self, book, histogram, weighted_rating):
+        book.refresh_from_db()
+        self.assertEqual(histogram, [book.stars_1, book.stars_2, book.stars_3, book.stars_4, book.stars_5])
+        self.assertEqual(weighted_rating, str(book.weighted_rating))
+
+    def test_incremental(self):
+        relation, _ = self.rate(self.book1, 5, 4)
+        # Nothing rated yet when the catalog mean was cached: (9 + 10 * 3) / (2 + 10)
+        self.assertRatings(self.book1, [0, 0, 0, 1, 1], '3.25')
+        relation.rate = 1
+        relation.save()
+        self.assertRatings(self.book1, [1, 0, 0, 1, 0], '2.92')
+        relation.rate = None
+        relation.save()
+        self.assertRatings(self.book1, [0, 0, 0, 1, 0], '3.09')
+        UserBookRelation.objects.filter(book=self.book1).delete()
+        self.assertRatings(self.book1, [0, 0, 0, 0, 0], '0.00')
+
+    def test_rebuild(self):
+        self.rate(self.book1, 5)
+        self.rate(self.book2, 2, 2, 2)
+        Book.objects.filter(pk=self.book2.pk).update(stars_2=0, stars_4=1)
+        self.assertEqual([self.book2.pk], [book.pk for book in find_counter_drift()])
+        # Catalog mean, id range, savepoint, lock, reset, histograms, ratings, release,
+        # savepoint, two author counter updates, release.
+        with self.assertNumQueries(12):
+            updated, prior = rebuild_ratings()
+        self.assertEqual(2, updated)
+        self.assertEqual(11 / 4, prior)
+        self.assertEqual(prior, get_cache().get(RATING_PRIOR_KEY))
+        self.assertEqual([], list(find_counter_drift()))
+        # (5 + 10 * 2.75) / 11 and (6 + 10 * 2.75) / 13
+        self.assertRatings(self.book1, [0, 0, 0, 0, 1], '2.95')
+        self.assertRatings(self.book2, [0, 3, 0, 0, 0], '2.58')
+
+    def test_rebuild_in_batches(self):
+        self.rate(self.book1, 5)
+        self.rate(self.book2, 2, 2, 2)
+        Book.objects.update(stars_2=0, stars_4=1, weighted_rating=0)
+        self.assertEqual((2, 11 / 4), rebuild_ratings(batch_size=1))
+        self.assertEqual([], list(find_counter_drift()))
+        self.assertRatings(self.book1, [0, 0, 0, 0, 1], '2.95')
+        self.assertRatings(self.book2, [0, 3, 0, 0, 0], '2.58')
+
+    def test_rebuild_resets_books_without_rates(self):
+        Book.objects.filter(pk=self.book1.pk).update(stars_3=2, rating_sum=6, rating_count=2, weighted_rating=3)
+        rebuild_ratings()
+        self.assertRatings(self.book1, [0, 0, 0, 0, 0], '0.00')
+
+    def test_command(self):
+        self.rate(self.book1, 4)
+        out = StringIO()
+        call_command('rebuild_book_ratings', stdout=out)
+        self.assertIn('Rebuilt ratings of 2 book(s), catalog mean 4.00', out.getvalue())
+
+    def test_api(self):
+        self.rate(self.book1, 3)
+        self.rate(self.book2, 5, 5, 5, 4)
+        response = self.client.get(reverse('api_v1:book-list'), data={'ordering': '-weighted_rating'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.book2.pk, self.book1.pk], [book['id'] for book in response.data['results']])
+        self.assertEqual(['3.50', '3.00'], [book['weighted_rating'] for book in response.data['results']])
+        self.assertEqual([0, 0, 0, 1, 3], response.data['results'][0]['rating_histogram'])
+        response = self.client.get(reverse('api_v1:book-detail', args=(self.book1.pk,)))
+        self.assertEqual([0, 0, 1, 0, 0], response.data['rating_histogram'])
+        response = self.client.get(reverse('api_v1:book-list'), data={'fields': 'id,rating_histogram'})
+        self.assertEqual({'id': self.book1.pk, 'rating_histogram': [0, 0, 1, 0, 0]}, response.data['results'][0])
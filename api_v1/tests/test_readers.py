@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.models import Book, UserBookRelation
+
+User = get_user_model()
+
+
+@override_settings(BOOKS_READERS_SAMPLE_SIZE=2)
+class BookReadersTestCase(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{i}', first_name=f'First {i}') for i in range(4)]
+        self.book1 = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+        self.book2 = Book.objects.create(name='Test Book 2', price=200, author_name='Author 2')
+        self.book3 = Book.objects.create(name='Test Book 3', price=300, author_name='Author 3')
+        for user in self.users:
+            UserBookRelation.objects.create(user=user, book=self.book1, is_liked=True)
+        UserBookRelation.objects.create(user=self.users[3], book=self.book2, rate=4)
+
+    def test_list_carries_capped_sample(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('api_v1:book-list'), data={'page_size': 3})
+        books = response.data['results']
+        self.assertEqual([4, 1, 0], [book['readers_count'] for book in books])
+        self.assertEqual([
+            {'id': self.users[0].id, 'first_name': 'First 0', 'last_name': ''},
+            {'id': self.users[1].id, 'first_name': 'First 1', 'last_name': ''},
+        ], books[0]['readers'])
+        self.assertEqual([self.users[3].id], [reader['id'] for reader in books[1]['readers']])
+        self.assertEqual([], books[2]['readers'])
+
+    def test_detail_keeps_all_readers(self):
+        response = self.client.get(reverse('api_v1:book-detail', args=(self.book1.id,)))
+        self.assertEqual(4, len(response.data['readers']))
+
+    def test_readers_sub_resource(self):
+        url = reverse('api_v1:book-readers', args=(self.book1.id,))
+        response = self.client.get(url, data={'page_size': 3})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(4, response.data['count'])
+        self.assertEqual([user.id for user in self.users[:3]], [reader['id'] for reader in response.data['results']])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([self.users[3].id], [reader['id'] for reader in response.data['results']])
+
+    def test_readers_of_missing_book(self):
+        response = self.client.get(reverse('api_v1:book-readers', args=(999,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
@@ -0,0 +1,144 @@
+import json
+from copy import deepcopy
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1 import replicas
+from api_v1.cache import get_cache
+from api_v1.replicas import ReplicaRouter, choose_replica, is_pinned, pin_to_primary
+from store.models import Author, Book
+
+User = get_user_model()
+
+
+@override_settings(BOOKS_READ_REPLICAS=['replica_0', 'replica_1'])
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        replicas._unavailable.clear()
+
+    def test_falls_back_to_available_replica(self):
+        with mock.patch.object(replicas, 'replica_available', side_effect=lambda alias: alias == 'replica_1'):
+            self.assertEqual('replica_1', choose_replica())
+
+    def test_falls_back_to_primary(self):
+        with mock.patch.object(replicas, 'replica_available', return_value=False):
+            self.assertIsNone(choose_replica())
+
+    def test_unavailable_replica_is_skipped_until_retry(self):
+        connection = mock.Mock(**{'ensure_connection.side_effect': OperationalError})
+        with mock.patch.dict(connections._connections.__dict__, {'replica_0': connection}):
+            self.assertFalse(replicas.replica_available('replica_0'))
+            self.assertFalse(replicas.replica_available('replica_0'))
+        self.assertEqual(1, connection.ensure_connection.call_count)
+
+    def test_writes_and_migrations_stay_on_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual('default', router.db_for_write(Book))
+        self.assertIsNone(router.db_for_read(Book))
+        self.assertFalse(router.allow_migrate('replica_0', 'store'))
+        self.assertIsNone(router.allow_migrate('default', 'store'))
+
+    def test_pin_to_primary(self):
+        user = User.objects.create(username='testuser')
+        self.assertFalse(is_pinned(user))
+        pin_to_primary(user.pk)
+        self.assertTrue(is_pinned(user))
+
+
+@override_settings(BOOKS_READ_REPLICAS=['default'])
+class ReplicaReadViewTestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(username='testuser')
+        self.book = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+
+    def test_safe_requests_are_routed(self):
+        with mock.patch.object(replicas, 'choose_replica', return_value='default') as choose:
+            response = self.client.get(reverse('api_v1:book-list'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        choose.assert_called_once_with()
+        self.assertIsNone(replicas.read_database())
+
+    def test_user_is_pinned_after_rating(self):
+        self.client.force_login(self.user)
+        response = self.client.patch(reverse('api_v1:userbookrelation-detail', args=(self.book.id,)),
+                                     data={'rate': 5}, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(is_pinned(self.user))
+        with mock.patch.object(replicas, 'choose_replica') as choose:
+            response = self.client.get(reverse('api_v1:book-detail', args=(self.book.id,)))
+        self.assertEqual('5.00', response.data['rating'])
+        choose.assert_not_called()
+
+
+class LaggingReplicaTestCase(APITestCase):
+    """
+    The replica is a second real database that never receives the writes, i.e. replication lag
+    that does not end, so stale reads and stale cache entries show up in the responses.
+    """
+    alias = 'lagging_replica'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test case set up its databases, so it is neither wrapped in a transaction nor blocked.
+        settings.DATABASES[cls.alias] = deepcopy(connections['default'].settings_dict)
+        settings.DATABASES[cls.alias]['TEST'].update(NAME=None, MIRROR=None)
+        cls.old_name = connections[cls.alias].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[cls.alias].creation.destroy_test_db(cls.old_name, verbosity=0)
+        del connections[cls.alias]
+        del settings.DATABASES[cls.alias]
+        super().tearDownClass()
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create(username='testuser')
+        self.other = User.objects.create(username='otheruser')
+        self.book = Book.objects.create(name='Test Book 1', price=100, author_name='Author 1')
+        # Replicated before the rating below.
+        Author.objects.using(self.alias).bulk_create([self.book.author])
+        Book.objects.using(self.alias).bulk_create([Book.objects.get(pk=self.book.pk)])
+        self.addCleanup(Author.objects.using(self.alias).all().delete)
+        self.addCleanup(Book.objects.using(self.alias).all().delete)
+        self.url = reverse('api_v1:book-detail', args=(self.book.id,))
+
+    def rate(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(reverse('api_v1:userbookrelation-detail', args=(self.book.id,)),
+                                     data={'rate': 5}, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def get(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url)
+
+    def test_replica_reads_are_cached_without_pins(self):
+        with override_settings(BOOKS_READ_REPLICAS=[self.alias]):
+            self.assertIsNone(self.get(self.other).data['rating'])
+            Book.objects.using(self.alias).filter(pk=self.book.pk).update(name='Renamed on the replica')
+            self.assertEqual('Test Book 1', self.get(self.other).data['name'])
+
+    def test_stale_replica_response_is_not_served_to_the_writer(self):
+        with override_settings(BOOKS_READ_REPLICAS=[self.alias]):
+            self.rate()
+            # Another reader still sees the lagging replica, under the versions bumped by the rating.
+            self.assertIsNone(self.get(self.other).data['rating'])
+            self.assertEqual('5.00', self.get(self.user).data['rating'])
+            self.client.force_login(self.user)
+            response = self.client.get(reverse('api_v1:async-book-detail', args=(self.book.id,)))
+            self.assertEqual('5.00', json.loads(response.content)['rating'])
+            # The replica catches up and the pins expire, a cached stale response would show up now.
+            Book.objects.using(self.alias).filter(pk=self.book.pk).update(rating=5)
+            get_cache().delete_many([replicas.pinned_key(self.user.pk), replicas.PIN_WINDOW_KEY])
+            self.assertEqual('5.00', self.get(self.other).data['rating'])
@@ -0,0 +1,45 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1.search import inverted_index_backend
+from store.models import Book
+
+
+class BookSearchTestCase(APITestCase):
+    def setUp(self):
+        self.book1 = Book.objects.create(name='The Lord of the Rings', price=100, author_name='J. R. R. Tolkien')
+        self.book2 = Book.objects.create(name='The Hobbit', price=200, author_name='J. R. R. Tolkien')
+        self.book3 = Book.objects.create(name='Tolkien: A Biography', price=300, author_name='Humphrey Carpenter')
+        self.book4 = Book.objects.create(name='Dune', price=400, author_name='Frank Herbert')
+        self.url_list = reverse('api_v1:book-list')
+
+    def search(self, term, **params):
+        response = self.client.get(self.url_list, data={'search': term, 'page_size': 10, **params})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [book['id'] for book in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual([self.book3.id, self.book1.id, self.book2.id], self.search('tolkien'))
+
+    def test_prefix_matching(self):
+        self.assertEqual([self.book2.id], self.search('hob'))
+        self.assertCountEqual([self.book1.id, self.book2.id], self.search('tolk the'))
+
+    def test_no_match(self):
+        self.assertEqual([], self.search('asimov'))
+
+    def test_explicit_ordering_wins_over_rank(self):
+        self.assertEqual([self.book3.id, self.book2.id, self.book1.id], self.search('tolkien', ordering='-price'))
+
+    def test_index_follows_updates_and_deletes(self):
+        self.search('dune')
+        self.book4.name = 'Children of Dune'
+        self.book4.save()
+        self.assertEqual([self.book4.id], self.search('children'))
+        self.book4.delete()
+        self.assertEqual([], self.search('dune'))
+
+    def test_rebuild(self):
+        inverted_index_backend.build()
+        self.assertEqual([self.book4.id], self.search('herb'))
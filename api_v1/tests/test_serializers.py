@@ -1,12 +1,15 @@
 from django.db.models import Count, Case, When, Avg, ExpressionWrapper, F, DecimalField, Subquery, OuterRef
 from django.test import TestCase
 
+from api_v1.cache import get_cache
 from api_v1.serializers import BookSerializer
 from store.models import Book, User, UserBookRelation
 
 
 class BookSerializerTestCase(TestCase):
     def test_serializer_is_ok(self):
+        # No cached catalog mean, the weighted ratings below are pulled towards 3.
+        get_cache().clear()
         user1 = User.objects.create(username='user1', first_name='user1', last_name='userov1')
         user2 = User.objects.create(username='user2')
         user3 = User.objects.create(username='user3')
@@ -41,6 +44,8 @@ class BookSerializerTestCase(TestCase):
                 'rating': '4.67',
                 'discounted_price': '50.00',
                 'owner_name': None,
+                'weighted_rating': '3.38',
+                'rating_histogram': [0, 0, 0, 1, 2],
                 'readers': [
                     {
                         'id': user1.id,
@@ -69,6 +74,8 @@ class BookSerializerTestCase(TestCase):
                 'rating': '3.50',
                 'discounted_price': '200.00',
                 'owner_name': 'user1',
+                'weighted_rating': '3.08',
+                'rating_histogram': [0, 0, 1, 1, 0],
                 'readers': [
                     {
                         'id': user1.id,
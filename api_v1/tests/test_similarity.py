@@ -0,0 +1,94 @@
+from io import StringIO
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_v1 import similarity
+from store.models import Book, SimilarBook, UserBookRelation
+
+User = get_user_model()
+
+
+@skipIf(similarity.np is None, 'numpy and scipy are not installed')
+class SimilarBooksTestCase(APITestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user_{i}') for i in range(4)]
+        self.books = [Book.objects.create(name=f'Test Book {i}', price=100 + i, author_name=f'Author {i}')
+                      for i in range(5)]
+        self.relate(0, 0, is_liked=True)
+        self.relate(0, 1, is_liked=True)
+        self.relate(1, 0, is_liked=True, rate=5)
+        self.relate(1, 1, is_liked=True, rate=5)
+        self.relate(1, 2, is_bookmarked=True)
+        self.relate(2, 2, is_liked=True)
+        self.relate(2, 3, is_liked=True)
+        self.relate(3, 4, rate=3)
+
+    def relate(self, user, book, **fields):
+        return UserBookRelation.objects.create(user=self.users[user], book=self.books[book], **fields)
+
+    def neighbours(self, book):
+        return list(SimilarBook.objects.filter(book=self.books[book]).order_by('-score')
+                    .values_list('similar_id', flat=True))
+
+    def test_refresh(self):
+        self.assertEqual(5, similarity.refresh_similar_books())
+        self.assertEqual([self.books[1].id, self.books[2].id], self.neighbours(0))
+        self.assertEqual([self.books[3].id, self.books[0].id, self.books[1].id], self.neighbours(2))
+        self.assertEqual([], self.neighbours(4))
+        score = SimilarBook.objects.get(book=self.books[0], similar=self.books[1]).score
+        self.assertAlmostEqual(1.0, score)
+
+    def test_size(self):
+        similarity.refresh_similar_books(size=1)
+        self.assertEqual([self.books[3].id], self.neighbours(2))
+
+    def test_incremental_refresh(self):
+        similarity.refresh_similar_books()
+        self.assertEqual(0, similarity.refresh_similar_books())
+        relation = UserBookRelation.objects.get(user=self.users[2], book=self.books[3])
+        relation.is_liked = False
+        relation.save()
+        # Book 3 lost its only like and book 2 listed it, books 0 and 1 are not affected.
+        self.assertEqual(2, similarity.refresh_similar_books())
+        self.assertEqual([self.books[0].id, self.books[1].id], self.neighbours(2))
+        self.assertEqual([], self.neighbours(3))
+        self.relate(3, 0, is_liked=True)
+        self.assertEqual(3, similarity.refresh_similar_books())
+        self.assertEqual(5, similarity.refresh_similar_books(full=True))
+
+    def test_incremental_matches_full(self):
+        similarity.refresh_similar_books()
+        UserBookRelation.objects.filter(user=self.users[1], book=self.books[2]).delete()
+        self.relate(3, 3, is_liked=True)
+        similarity.refresh_similar_books()
+        incremental = sorted(SimilarBook.objects.values_list('book_id', 'similar_id'))
+        similarity.refresh_similar_books(full=True)
+        self.assertEqual(sorted(SimilarBook.objects.values_list('book_id', 'similar_id')), incremental)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('refresh_similar_books', '--batch-size', '2', stdout=out)
+        self.assertIn('Refreshed similar books of 5 book(s)', out.getvalue())
+
+    def test_endpoint(self):
+        similarity.refresh_similar_books()
+        url = reverse('api_v1:book-similar', args=(self.books[0].id,))
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        first = dict(response.data[0])
+        self.assertAlmostEqual(1.0, first.pop('score'))
+        self.assertEqual({'id': self.books[1].id, 'name': 'Test Book 1', 'author_name': 'Author 1',
+                          'price': '101.00'}, first)
+        self.assertEqual([self.books[1].id, self.books[2].id], [book['id'] for book in response.data])
+
+    def test_endpoint_without_neighbours(self):
+        response = self.client.get(reverse('api_v1:book-similar', args=(self.books[4].id,)))
+        self.assertEqual([], response.data)
+        response = self.client.get(reverse('api_v1:book-similar', args=(999,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
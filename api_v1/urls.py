@@ -1,14 +1,25 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from api_v1.views import BookViewSet, UserBookRelationView
+from api_v1 import async_views
+from api_v1.views import AuthorViewSet, BookViewSet, UserBookRelationView, connections
 
 app_name = 'api_v1'
 
 router = routers.DefaultRouter()
+router.register('author', AuthorViewSet)
 router.register('book', BookViewSet)
 router.register('book_relation', UserBookRelationView)
 
+async_urlpatterns = [
+    path('book/', async_views.book_list, name='async-book-list'),
+    path('book/<int:pk>/', async_views.book_detail, name='async-book-detail'),
+    path('book_relation/', async_views.relation_list, name='async-userbookrelation-list'),
+    path('book_relation/<int:book>/', async_views.relation_retrieve, name='async-userbookrelation-detail'),
+]
+
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
+    path('connections/', connections, name='connections'),
     path('', include(router.urls)),
 ]
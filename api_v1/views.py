@@ -1,46 +1,245 @@
-from django.db.models import Count, Case, When, ExpressionWrapper, F, DecimalField, Prefetch, Subquery, OuterRef
-from django.shortcuts import render
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, DecimalField, Prefetch
+from django.http import StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.mixins import UpdateModelMixin
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from api_v1.bulk import bulk_save_books, bulk_upsert_relations
+from api_v1.cache import ALL_VERSION, LIST_VERSION, CachedResponseMixin
+from api_v1.export import EXPORT_FORMATS, export_books
+from api_v1.filters import BookFilter, book_facets
+from api_v1.logic import LEADERBOARDS, ensure_relation, leaderboard
+from api_v1.metrics import timed_serializer
+from api_v1.pagination import BookPageNumberPagination, BookPagination
+from api_v1.parsers import NDJSONParser
 from api_v1.permissions import IsOwnerOrStaffOrReadOnly
-from api_v1.serializers import BookSerializer, UserBookRelationSerializer
-from store.models import Book, UserBookRelation, User
-
-
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.annotate(
-        likes_count=Count(Case(When(userbookrelation__is_liked=True, then=1))),
-        discounted_price=ExpressionWrapper(F('price') - F('discount'), output_field=DecimalField()),
-        owner_name=Subquery(User.objects.filter(id=OuterRef('owner_id')).values('username'))
-    ).prefetch_related(
-        Prefetch('readers', queryset=User.objects.all().distinct().only('id', 'first_name', 'last_name'))
-    ).order_by('pk')
+from api_v1.replicas import ReplicaReadMixin
+from api_v1.search import BookSearchFilter
+from api_v1.serializers import AuthorSerializer, BookSerializer, BookListSerializer, BookRowSerializer, \
+    LeaderboardBookSerializer, SimilarBookSerializer, UserBookRelationSerializer, UserSerializer
+from books.db.connections import stats as connection_stats
+from store.models import Author, Book, SimilarBook, UserBookRelation, User
+
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+# List parameters that do not change which books are counted by ?facets=1, facets itself is 1 or true.
+FACETS_IGNORED = ('facets', 'page', 'page_size', 'pagination', 'cursor', 'ordering', 'fields')
+
+
+def book_queryset(owner_name=True, readers=True):
+    annotations = {
+        'likes_count': F('likes_total'),
+        'discounted_price': ExpressionWrapper(F('price') - F('discount'), output_field=DecimalField()),
+    }
+    if owner_name:
+        annotations['owner_name'] = F('owner__username')
+    queryset = Book.objects.annotate(**annotations).defer('search_vector')
+    if readers:
+        queryset = queryset.prefetch_related(
+            Prefetch('readers', queryset=User.objects.all().distinct().only('id', 'first_name', 'last_name'))
+        )
+    return queryset.order_by('pk')
+
+
+class RowListMixin:
+    def list(self, request, *args, **kwargs):
+        serializer = BookRowSerializer.for_fields(self.get_requested_fields())
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = [field.lstrip('-') for field in queryset.query.order_by if isinstance(field, str)]
+        columns = list(dict.fromkeys(serializer.columns + [field for field in ordering if field != 'pk']))
+        rows = queryset.values(*columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with timed_serializer():
+                data = serializer.to_representation(page)
+            return self.get_paginated_response(data)
+        rows = list(rows)
+        with timed_serializer():
+            return Response(serializer.to_representation(rows))
+
+
+class BookViewSet(ReplicaReadMixin, CachedResponseMixin, RowListMixin, viewsets.ModelViewSet):
+    queryset = book_queryset()
     serializer_class = BookSerializer
+    pagination_class = BookPagination
     permission_classes = [IsOwnerOrStaffOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['price']
+    filter_backends = [DjangoFilterBackend, BookSearchFilter, OrderingFilter]
+    filterset_class = BookFilter
     search_fields = ['name', 'author_name']
-    ordering_fields = ['price', 'author_name']
+    ordering_fields = ['price', 'author_name', 'weighted_rating']
+
+    def get_requested_fields(self):
+        allowed = BookListSerializer.Meta.fields if self.action == 'list' else BookSerializer.Meta.fields
+        requested = self.request.query_params.get('fields')
+        if not requested:
+            return None
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = names - set(allowed)
+        if unknown:
+            raise ValidationError({'fields': [f'Unknown field(s): {", ".join(sorted(unknown))}.']})
+        return tuple(name for name in allowed if name in names)
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            fields = self.get_requested_fields()
+            return book_queryset(
+                owner_name=fields is None or 'owner_name' in fields,
+                readers=self.action == 'retrieve' and (fields is None or 'readers' in fields),
+            )
+        return super().get_queryset()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_requested_fields() if self.action == 'retrieve' else None
+        if fields is not None:
+            for name in set(serializer.fields) - set(fields):
+                serializer.fields.pop(name)
+        return serializer
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('facets') in ('1', 'true'):
+            return self.cached_response(request, [ALL_VERSION, LIST_VERSION], self.facets, ignored=FACETS_IGNORED)
+        return super().list(request, *args, **kwargs)
+
+    def facets(self, request):
+        return Response(book_facets(self.filter_queryset(Book.objects.all())))
 
     def perform_create(self, serializer):
         serializer.validated_data['owner'] = self.request.user
         serializer.save()
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated],
+            parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of books.']})
+        if len(items) > settings.BOOKS_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [f'Ensure there are no more than '
+                                                        f'{settings.BOOKS_BULK_MAX_ITEMS} books.']})
+        results = bulk_save_books(items, request.user)
+        statuses = [result['status'] for result in results]
+        return Response({
+            'created': statuses.count('created'),
+            'updated': statuses.count('updated'),
+            'failed': statuses.count('error'),
+            'results': results,
+        })
+
+    @action(detail=True, methods=['get'])
+    def readers(self, request, pk=None):
+        book = get_object_or_404(Book.objects.only('pk'), pk=pk)
+        queryset = User.objects.filter(userbookrelation__book=book).only('id', 'first_name', 'last_name') \
+            .distinct().order_by('pk')
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(UserSerializer(page, many=True).data)
 
-class UserBookRelationView(UpdateModelMixin, GenericViewSet):
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        # Precomputed by refresh_similar_books, the book itself is only looked up when it has no neighbours.
+        neighbours = SimilarBook.objects.filter(book_id=pk).select_related('similar') \
+            .only('similar_id', 'score', 'similar__name', 'similar__author_name', 'similar__price') \
+            .order_by('-score')[:settings.BOOKS_SIMILAR_BOOKS]
+        data = SimilarBookSerializer(neighbours, many=True).data
+        if not data:
+            get_object_or_404(Book.objects.only('pk'), pk=pk)
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path=r'top/(?P<board>[a-z_]+)')
+    def top(self, request, board=None):
+        if board not in LEADERBOARDS:
+            raise NotFound(f'Choose one of: {", ".join(LEADERBOARDS)}.')
+        try:
+            size = min(int(request.query_params.get('limit', LEADERBOARD_SIZE)), LEADERBOARD_MAX_SIZE)
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        return self.cached_response(request, [ALL_VERSION, LIST_VERSION], self.leaderboard, board, max(size, 1))
+
+    def leaderboard(self, request, board, size):
+        books = leaderboard(self.filter_queryset(Book.objects.defer('search_vector')), board, size)
+        return Response(LeaderboardBookSerializer(books, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': [f'Choose one of: {", ".join(EXPORT_FORMATS)}.']})
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(export_books(queryset, export_format),
+                                         content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
+
+
+class AuthorViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    # Counters are kept up to date with the books and relations of the author, books by an author
+    # are listed by /api/v1/book/?author_id=<id>. Authors whose books were all renamed or deleted are left out.
+    queryset = Author.objects.filter(books_count__gt=0).order_by('pk')
+    serializer_class = AuthorSerializer
+    pagination_class = BookPageNumberPagination
+    filter_backends = [SearchFilter, OrderingFilter]
+    search_fields = ['name']
+    ordering_fields = ['name', 'books_count', 'rating', 'likes_total']
+
+
+class UserBookRelationView(ReplicaReadMixin, UpdateModelMixin, GenericViewSet):
     queryset = UserBookRelation.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = UserBookRelationSerializer
     lookup_field = 'book'
 
     def get_object(self):
-        obj, created = UserBookRelation.objects.get_or_create(user=self.request.user, book_id=self.kwargs['book'])
-        return obj
+        # The row lock is held until the rating delta is applied, so parallel updates of one
+        # relation are serialized and each one sees the rate the previous one saved.
+        return UserBookRelation.objects.select_for_update().get(user=self.request.user, book_id=self.kwargs['book'])
+
+    def update(self, request, *args, **kwargs):
+        try:
+            return self.locked_update(request, *args, **kwargs)
+        except UserBookRelation.DoesNotExist:
+            # First update of the relation, created outside the transaction so a rejected update keeps it.
+            ensure_relation(request.user, self.kwargs['book'])
+            return self.locked_update(request, *args, **kwargs)
+
+    def locked_update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            # The book row before the relation, in the order bulk_upsert_relations locks them,
+            # and with FOR NO KEY UPDATE like there, so it does not block the foreign key checks of relation inserts.
+            get_object_or_404(Book.objects.select_for_update(no_key=True).only('pk'), pk=self.kwargs['book'])
+            return super().update(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of relations.']})
+        if len(items) > settings.BOOKS_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [f'Ensure there are no more than '
+                                                        f'{settings.BOOKS_BULK_MAX_ITEMS} relations.']})
+        results = bulk_upsert_relations(items, request.user)
+        statuses = [result['status'] for result in results]
+        return Response({
+            'created': statuses.count('created'),
+            'updated': statuses.count('updated'),
+            'failed': statuses.count('error'),
+            'results': results,
+        })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def connections(request):
+    return Response(connection_stats.snapshot())
 
 
 def oauth(request):
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'books.settings')
+# Lets the settings pick the ASGI defaults, e.g. of POSTGRES_CONN_MAX_AGE.
+os.environ['BOOKS_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = defaultdict(Counter)
+            self.wait_max = defaultdict(float)
+
+    def record_checkout(self, alias, reused, wait):
+        with self.lock:
+            self.counts[alias]['hits' if reused else 'misses'] += 1
+            self.counts[alias]['wait_seconds_total'] += wait
+            self.wait_max[alias] = max(self.wait_max[alias], wait)
+
+    def record_health_check_failure(self, alias):
+        with self.lock:
+            self.counts[alias]['health_check_failures'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                alias: {
+                    'hits': counts['hits'],
+                    'misses': counts['misses'],
+                    'health_check_failures': counts['health_check_failures'],
+                    'wait_seconds_total': counts['wait_seconds_total'],
+                    'wait_seconds_max': self.wait_max[alias],
+                }
+                for alias, counts in self.counts.items()
+            }
+
+
+stats = ConnectionStats()
+
+
+class ConnectionReuseMixin:
+    """
+    Counts connection checkouts (the first use of a connection in a request) as pool hits
+    or misses and checks a reused connection with is_usable() before handing it out when
+    CONN_HEALTH_CHECKS is set, like Django 4.1 does.
+    """
+    checked_out = False
+
+    def close_if_unusable_or_obsolete(self):
+        # Called by Django at the start and the end of every request.
+        super().close_if_unusable_or_obsolete()
+        self.checked_out = False
+
+    def close(self):
+        super().close()
+        self.checked_out = False
+
+    def ensure_connection(self):
+        if self.checked_out:
+            return super().ensure_connection()
+        started = time.perf_counter()
+        if self.connection is not None and self.settings_dict.get('CONN_HEALTH_CHECKS') and \
+                not self.in_atomic_block and not self.is_usable():
+            stats.record_health_check_failure(self.alias)
+            self.close()
+        reused = self.connection is not None
+        self.checked_out = True
+        super().ensure_connection()
+        stats.record_checkout(self.alias, reused, time.perf_counter() - started)
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from books.db.connections import ConnectionReuseMixin
+
+
+class DatabaseWrapper(ConnectionReuseMixin, base.DatabaseWrapper):
+    pass
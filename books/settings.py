@@ -19,6 +19,9 @@ from django.core.management.utils import get_random_secret_key
 
 load_dotenv()
 
+# Set by books/asgi.py.
+ASGI = bool(int(os.environ.get('BOOKS_ASGI', default=0)))
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -46,7 +49,6 @@ INSTALLED_APPS = [
 
     # libs
     'social_django',
-    'debug_toolbar',
 
     # custom
     'store',
@@ -54,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_v1.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,11 +64,16 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
-    'debug_toolbar_force.middleware.ForceDebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    # The toolbar middlewares are sync only and would push async views back into a thread.
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += [
+        'debug_toolbar.middleware.DebugToolbarMiddleware',
+        'debug_toolbar_force.middleware.ForceDebugToolbarMiddleware',
+    ]
+
 ROOT_URLCONF = 'books.urls'
 
 TEMPLATES = [
@@ -93,15 +101,62 @@ WSGI_APPLICATION = 'books.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'books.db.postgresql',
         'NAME': os.environ.get('POSTGRES_DB'),
         'USER': os.environ.get('POSTGRES_USER'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('POSTGRES_HOST'),
         'PORT': os.environ.get('POSTGRES_PORT'),
+        # Seconds to keep a connection open between requests, 0 closes it after every request. Under ASGI sync code
+        # runs in sync_to_async worker threads, each keeping its own connection that no request closes once it is
+        # persistent, so there they are closed after every request unless configured otherwise.
+        'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', default=0 if ASGI else 60)),
+        'CONN_HEALTH_CHECKS': bool(int(os.environ.get('POSTGRES_CONN_HEALTH_CHECKS', default=1))),
+        # Required behind PgBouncer in transaction pooling mode.
+        'DISABLE_SERVER_SIDE_CURSORS': bool(int(os.environ.get('POSTGRES_DISABLE_SERVER_SIDE_CURSORS', default=0))),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('POSTGRES_CONNECT_TIMEOUT', default=5)),
+        },
     }
 }
 
+# Comma separated host[:port] list of streaming replicas of the default database.
+BOOKS_READ_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(','))):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    BOOKS_READ_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['api_v1.replicas.ReplicaRouter']
+
+BOOKS_REPLICA_STICKY_SECONDS = int(os.environ.get('BOOKS_REPLICA_STICKY_SECONDS', default=10))
+BOOKS_REPLICA_RETRY_SECONDS = int(os.environ.get('BOOKS_REPLICA_RETRY_SECONDS', default=30))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'books': {
+        'BACKEND': os.environ.get('BOOKS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('BOOKS_CACHE_LOCATION', 'books'),
+        'TIMEOUT': int(os.environ.get('BOOKS_CACHE_TIMEOUT', default=300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('BOOKS_CACHE_MAX_ENTRIES', default=1000)),
+        },
+    },
+}
+
+BOOKS_CACHE = 'books'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -155,6 +210,25 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 2
 }
 
+BOOKS_READERS_SAMPLE_SIZE = int(os.environ.get('BOOKS_READERS_SAMPLE_SIZE', default=5))
+BOOKS_BULK_MAX_ITEMS = int(os.environ.get('BOOKS_BULK_MAX_ITEMS', default=10000))
+BOOKS_BULK_CHUNK_SIZE = int(os.environ.get('BOOKS_BULK_CHUNK_SIZE', default=1000))
+BOOKS_EXPORT_CHUNK_SIZE = int(os.environ.get('BOOKS_EXPORT_CHUNK_SIZE', default=2000))
+# Bearer token required by /metrics when set.
+BOOKS_METRICS_TOKEN = os.environ.get('BOOKS_METRICS_TOKEN')
+# Queue rating and like changes for the drain_rating_queue command instead of updating the book counters in the request.
+BOOKS_RATING_DEFERRED = bool(int(os.environ.get('BOOKS_RATING_DEFERRED', default=0)))
+# Votes of the catalog mean added to every book's votes by the weighted rating, a book with fewer votes stays near the mean.
+BOOKS_RATING_PRIOR_VOTES = int(os.environ.get('BOOKS_RATING_PRIOR_VOTES', default=10))
+# Neighbours kept per book by refresh_similar_books and served by /api/v1/book/<id>/similar/.
+BOOKS_SIMILAR_BOOKS = int(os.environ.get('BOOKS_SIMILAR_BOOKS', default=20))
+# Log api_v1 requests that run the same query shape BOOKS_QUERY_REPEAT_THRESHOLD times (N+1) or a query slower
+# than BOOKS_SLOW_QUERY_MS, and raise instead with BOOKS_QUERY_DETECTOR_RAISE, e.g. in the test suite.
+BOOKS_QUERY_DETECTOR = bool(int(os.environ.get('BOOKS_QUERY_DETECTOR', default=0)))
+BOOKS_QUERY_DETECTOR_RAISE = bool(int(os.environ.get('BOOKS_QUERY_DETECTOR_RAISE', default=0)))
+BOOKS_QUERY_REPEAT_THRESHOLD = int(os.environ.get('BOOKS_QUERY_REPEAT_THRESHOLD', default=5))
+BOOKS_SLOW_QUERY_MS = float(os.environ.get('BOOKS_SLOW_QUERY_MS', default=200))
+
 SOCIAL_AUTH_JSONFIELD_ENABLED = True
 
 
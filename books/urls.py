@@ -17,6 +17,7 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
+from api_v1.metrics import metrics
 from api_v1.views import oauth
 
 api_urlpatterns = [
@@ -27,7 +28,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(api_urlpatterns)),
     path('', include('social_django.urls', namespace='social')),
-    path('auth/', oauth)
+    path('auth/', oauth),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
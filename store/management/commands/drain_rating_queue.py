@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api_v1.logic import drain_rating_queue
+
+
+class Command(BaseCommand):
+    help = 'Recompute the rating and like counters of books queued while BOOKS_RATING_DEFERRED is on'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep draining every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                book_ids = drain_rating_queue(options['batch_size'])
+                if not book_ids:
+                    break
+                total += len(book_ids)
+            if total or not options['loop']:
+                self.stdout.write(f'Recomputed {total} book(s)')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction, DEFAULT_DB_ALIAS
+
+from api_v1.loader import CatalogLoader, read_records
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+
+class Command(BaseCommand):
+    help = 'Stream a JSON fixture, NDJSON or CSV file into the database with COPY/bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Inferred from the file extension by default')
+        parser.add_argument('--model', help='Model label of CSV rows, e.g. store.book')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Unknown format "{file_format}", use --format')
+        if file_format == 'csv' and not options['model']:
+            raise CommandError('--model is required for CSV files')
+
+        loader = CatalogLoader(using=options['database'], chunk_size=options['chunk_size'])
+        with path.open(encoding='utf-8', newline='') as stream, transaction.atomic(using=options['database']):
+            for record in read_records(stream, file_format, options['model']):
+                loader.add(record)
+            counts = loader.finish()
+
+        elapsed = loader.elapsed
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count} row(s)')
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {total} row(s) in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/sec)'
+        ))
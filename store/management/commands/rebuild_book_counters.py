@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_v1.cache import invalidate_books
+from api_v1.logic import find_counter_drift, link_authors, rebuild_counters
+from store.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized rating and like counters of books from user-book relations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report books whose counters drifted')
+
+    def handle(self, *args, **options):
+        drifted = list(find_counter_drift())
+        for book in drifted:
+            self.stdout.write(
+                f'Book {book.pk}: rating_sum {book.rating_sum} -> {book.expected_rating_sum}, '
+                f'rating_count {book.rating_count} -> {book.expected_rating_count}, '
+                f'likes_total {book.likes_total} -> {book.expected_likes_total}, '
+                f'bookmarks_total {book.bookmarks_total} -> {book.expected_bookmarks_total}'
+            )
+        if options['check']:
+            self.stdout.write(f'{len(drifted)} book(s) with drifted counters')
+            return
+        with transaction.atomic():
+            # Books written without Book.save(), e.g. by loaddata, get their authors here.
+            link_authors(Book.objects.filter(author=None))
+            updated = rebuild_counters()
+        invalidate_books()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters of {updated} book(s), {len(drifted)} had drifted'))
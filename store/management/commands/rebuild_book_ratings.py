@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.cache import invalidate_books
+from api_v1.logic import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute star histograms, ratings and weighted ratings of all books in a few set-based queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Books locked and recomputed at once')
+
+    def handle(self, *args, **options):
+        updated, prior = rebuild_ratings(batch_size=options['batch_size'])
+        invalidate_books()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings of {updated} book(s), catalog mean {prior:.2f}'))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from api_v1.similarity import refresh_similar_books
+
+
+class Command(BaseCommand):
+    help = 'Recompute the similar books of books whose likes, bookmarks or ratings changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=settings.BOOKS_SIMILAR_BOOKS,
+                            help='Neighbours to keep per book')
+        parser.add_argument('--batch-size', type=int, default=500, help='Books whose similarities are computed at once')
+        parser.add_argument('--full', action='store_true', help='Recompute all books')
+
+    def handle(self, *args, **options):
+        try:
+            refreshed = refresh_similar_books(options['size'], options['batch_size'], options['full'])
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed similar books of {refreshed} book(s)'))
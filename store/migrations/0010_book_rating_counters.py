@@ -0,0 +1,46 @@
+# Generated by Django 4.0.5 on 2026-10-18 14:06
+
+from django.db import migrations, models
+from django.db.models import Count, Case, When, Sum
+
+
+def fill_counters(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+    counters = UserBookRelation.objects.values('book').annotate(
+        rating_sum=Sum('rate'),
+        rating_count=Count('rate'),
+        likes_total=Count(Case(When(is_liked=True, then=1))),
+    ).order_by()
+    for row in counters:
+        Book.objects.filter(pk=row['book']).update(
+            rating_sum=row['rating_sum'] or 0,
+            rating_count=row['rating_count'],
+            likes_total=row['likes_total'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_book_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='likes_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.5 on 2026-10-18 14:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Book = apps.get_model('store', 'Book')
+    Book.objects.update(
+        search_vector=SearchVector('name', weight='A', config='simple') +
+        SearchVector('author_name', weight='B', config='simple')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_book_rating_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='store_book_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Avg, Count, Case, When, Sum
+
+
+def merge_duplicate_relations(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+    duplicates = list(
+        UserBookRelation.objects.values('user', 'book').annotate(total=Count('pk')).filter(total__gt=1).order_by()
+    )
+    for row in duplicates:
+        relations = list(UserBookRelation.objects.filter(user=row['user'], book=row['book']).order_by('-pk'))
+        relation = relations[0]
+        relation.is_liked = any(duplicate.is_liked for duplicate in relations)
+        relation.is_bookmarked = any(duplicate.is_bookmarked for duplicate in relations)
+        relation.rate = next((duplicate.rate for duplicate in relations if duplicate.rate is not None), None)
+        relation.save(update_fields=['is_liked', 'is_bookmarked', 'rate'])
+        UserBookRelation.objects.filter(pk__in=[duplicate.pk for duplicate in relations[1:]]).delete()
+
+    counters = UserBookRelation.objects.filter(book__in={row['book'] for row in duplicates}).values('book').annotate(
+        rating=Avg('rate'),
+        rating_sum=Sum('rate'),
+        rating_count=Count('rate'),
+        likes_total=Count(Case(When(is_liked=True, then=1))),
+    ).order_by()
+    for row in counters:
+        Book.objects.filter(pk=row['book']).update(
+            rating=row['rating'],
+            rating_sum=row['rating_sum'] or 0,
+            rating_count=row['rating_count'],
+            likes_total=row['likes_total'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_relations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.5 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_book_indexes_relation_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedBookRating',
+            fields=[
+                ('book_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('queued_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
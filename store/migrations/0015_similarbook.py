@@ -0,0 +1,34 @@
+# Generated by Django 4.0.5 on 2026-10-18 14:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_queuedbookrating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityFingerprint',
+            fields=[
+                ('book_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fingerprint', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_books', to='store.book')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.book')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='similarbook',
+            index=models.Index(fields=['book', '-score'], name='store_similar_book_score_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.5 on 2026-10-18 14:50
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_bookmarks(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+    counters = UserBookRelation.objects.filter(is_bookmarked=True).values('book').annotate(total=Count('pk')).order_by()
+    for row in counters:
+        Book.objects.filter(pk=row['book']).update(bookmarks_total=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_similarbook'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='bookmarks_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_bookmarks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-likes_total', 'id'], name='store_book_likes_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-bookmarks_total', 'id'], name='store_book_bookmarks_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('rating__isnull', False)), fields=['-rating', '-rating_count', 'id'], name='store_book_rating_idx'),
+        ),
+    ]
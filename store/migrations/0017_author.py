@@ -0,0 +1,75 @@
+# Generated by Django 4.0.5 on 2026-10-18 14:54
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+import django.db.models.deletion
+
+CHUNK_SIZE = 500
+
+
+def create_authors(apps, schema_editor):
+    Author = apps.get_model('store', 'Author')
+    Book = apps.get_model('store', 'Book')
+    spellings = defaultdict(Counter)
+    for name, total in Book.objects.values_list('author_name').annotate(total=Count('pk')).order_by():
+        spellings[' '.join(name.split()).casefold()][name] += total
+    keys = list(spellings)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = keys[start:start + CHUNK_SIZE]
+        # The most used spelling names the author, e.g. 'Leo Tolstoy' over 'leo  tolstoy'.
+        Author.objects.bulk_create([
+            Author(key=key, name=' '.join(min(spellings[key], key=lambda name: (-spellings[key][name], name)).split()))
+            for key in chunk
+        ])
+        authors = dict(Author.objects.filter(key__in=chunk).values_list('key', 'pk'))
+        names = {name: authors[key] for key in chunk for name in spellings[key]}
+        Book.objects.filter(author_name__in=list(names)).update(author_id=Case(
+            *[When(author_name=name, then=Value(pk)) for name, pk in names.items()], output_field=IntegerField()
+        ))
+    counters = Book.objects.values('author').annotate(
+        books_count=Count('pk'), rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'),
+        likes_total=Sum('likes_total'),
+    ).order_by()
+    authors = [
+        Author(pk=row['author'], books_count=row['books_count'], rating_sum=row['rating_sum'],
+               rating_count=row['rating_count'], likes_total=row['likes_total'],
+               rating=round(row['rating_sum'] / row['rating_count'], 2) if row['rating_count'] else None)
+        for row in counters
+    ]
+    Author.objects.bulk_update(authors, ['books_count', 'rating_sum', 'rating_count', 'likes_total', 'rating'],
+                               batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_book_bookmarks_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('books_count', models.PositiveIntegerField(default=0)),
+                ('rating', models.DecimalField(decimal_places=2, default=None, max_digits=3, null=True)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('likes_total', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='author',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='books', to='store.author'),
+        ),
+        migrations.RunPython(create_authors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', 'id'], name='store_book_author_id_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+
+
+def fill_ratings(apps, schema_editor):
+    Book = apps.get_model('store', 'Book')
+    UserBookRelation = apps.get_model('store', 'UserBookRelation')
+    histograms = UserBookRelation.objects.filter(rate__isnull=False).values('book').annotate(
+        **{f'stars_{rate}': Count('pk', filter=Q(rate=rate)) for rate in range(1, 6)}
+    ).order_by()
+    for row in histograms:
+        Book.objects.filter(pk=row.pop('book')).update(**row)
+    totals = Book.objects.aggregate(rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+    prior = totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 3
+    # The default of BOOKS_RATING_PRIOR_VOTES, fixed so the migration does not depend on the environment.
+    votes = 10
+    Book.objects.filter(rating_count__gt=0).update(
+        weighted_rating=(Cast(F('rating_sum'), FloatField()) + votes * prior) / (F('rating_count') + votes)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_author'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='weighted_rating',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-weighted_rating', 'id'], name='store_book_weighted_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.5 on 2026-10-18 15:36
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_book_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='store_book_rating_idx',
+        ),
+    ]
@@ -1,21 +1,95 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 
 User = get_user_model()
 
 
+def author_key(name):
+    # Spellings differing only in case or whitespace belong to one author.
+    return ' '.join(name.split()).casefold()
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True)
+    books_count = models.PositiveIntegerField(default=0)
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=None, null=True)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    likes_total = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}'
+
+
 class Book(models.Model):
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=7, decimal_places=2)
     author_name = models.CharField(max_length=255)
+    # Set from author_name on save, indexed together with id below.
+    author = models.ForeignKey(Author, on_delete=models.SET_NULL, null=True, db_index=False, related_name='books')
     owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='owned_books')
     readers = models.ManyToManyField(User, through='store.UserBookRelation', related_name='rated_books')
     discount = models.DecimalField(max_digits=6, decimal_places=2, default=0)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=None, null=True)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    likes_total = models.PositiveIntegerField(default=0)
+    bookmarks_total = models.PositiveIntegerField(default=0)
+    # Number of 1 to 5 star rates, rating_sum and rating_count are their weighted and plain sums.
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    weighted_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price', 'id'], name='store_book_price_id_idx'),
+            models.Index(fields=['author_name', 'id'], name='store_book_author_name_id_idx'),
+            models.Index(fields=['author', 'id'], name='store_book_author_id_idx'),
+            # Leaderboards read the first rows of these instead of sorting all books.
+            models.Index(fields=['-likes_total', 'id'], name='store_book_likes_total_idx'),
+            models.Index(fields=['-bookmarks_total', 'id'], name='store_book_bookmarks_total_idx'),
+            models.Index(fields=['-weighted_rating', 'id'], name='store_book_weighted_rating_idx'),
+            GinIndex(fields=['search_vector'], name='store_book_search_vector_gin'),
+        ]
 
     def __str__(self):
         return f'{self.name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remembered without touching deferred fields, save() compares against them.
+        book = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        book._loaded_author = (loaded.get('author_name'), loaded.get('author_id'))
+        return book
+
+    def save(self, *args, **kwargs):
+        from api_v1.logic import rebuild_author_counters
+
+        adding = self._state.adding
+        previous_name, previous_author = getattr(self, '_loaded_author', (None, None))
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'author_name' in update_fields) and \
+                (self.author_id is None or self.author_name != previous_name):
+            self.author = Author.objects.get_or_create(
+                key=author_key(self.author_name), defaults={'name': ' '.join(self.author_name.split())}
+            )[0]
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'author'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding or self.author_id != previous_author:
+                rebuild_author_counters(Author.objects.filter(pk__in={self.author_id, previous_author} - {None}))
+        self._loaded_author = (self.author_name, self.author_id)
+
 
 class UserBookRelation(models.Model):
 
@@ -39,23 +113,59 @@ class UserBookRelation(models.Model):
     is_bookmarked = models.BooleanField(default=False)
     rate = models.PositiveSmallIntegerField(choices=RATE_CHOICES, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'book'], name='store_userbookrelation_user_book_uniq'),
+        ]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.__rate = self.rate
+        self.__is_liked = self.is_liked
+        self.__is_bookmarked = self.is_bookmarked
 
     def __str__(self):
         return f'{self.user} | {self.book} | {self.rate}'
 
     def save(self, *args, **kwargs):
-        from api_v1.logic import set_rating
+        from api_v1.logic import apply_relation_delta
 
         creating_now = not self.pk
 
-        super().save(*args, **kwargs)
-
-        new_rating = self.rate
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        if self.__rate != new_rating or creating_now:
-            set_rating(self.book)
+            if creating_now:
+                apply_relation_delta(self.book_id, rate_after=self.rate, liked_after=self.is_liked,
+                                     bookmarked_after=self.is_bookmarked)
+            else:
+                apply_relation_delta(self.book_id, self.__rate, self.rate, self.__is_liked, self.is_liked,
+                                     self.__is_bookmarked, self.is_bookmarked)
 
         self.__rate = self.rate
+        self.__is_liked = self.is_liked
+        self.__is_bookmarked = self.is_bookmarked
+
+
+class QueuedBookRating(models.Model):
+    # No foreign key, a relation deleted together with its book may still queue the book.
+    book_id = models.BigIntegerField(primary_key=True)
+    queued_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class SimilarBook(models.Model):
+    # Top neighbours of a book by item-item cosine similarity, written by the refresh_similar_books command.
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_books')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['book', '-score'], name='store_similar_book_score_idx'),
+        ]
+
+
+class SimilarityFingerprint(models.Model):
+    # Hash of the relations a book's neighbours were last computed from, unchanged books are skipped.
+    book_id = models.BigIntegerField(primary_key=True)
+    fingerprint = models.BigIntegerField()
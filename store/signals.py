@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from store.models import Author, Book, UserBookRelation
+
+
+@receiver(post_delete, sender=UserBookRelation)
+def relation_deleted(sender, instance, **kwargs):
+    from api_v1.logic import apply_relation_delta
+
+    apply_relation_delta(instance.book_id, rate_before=instance.rate, liked_before=instance.is_liked,
+                         bookmarked_before=instance.is_bookmarked)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    from api_v1.logic import rebuild_author_counters
+
+    if instance.author_id is not None:
+        rebuild_author_counters(Author.objects.filter(pk=instance.author_id))